@@ -0,0 +1,254 @@
+""" Render benchmarks, run from the repository root:
+
+        python -m benchmarks.run                  quick scenes, prints results
+        python -m benchmarks.run --preset full    1e2 to 1e6 triangles, up to 3840 wide
+        python -m benchmarks.run --baseline benchmarks/baseline.json
+                                                  fails (exit 1) on a regression
+
+    Every stage is timed separately, best of --repeat runs:
+        transform  vertex projection and vertex shader (Renderer.transform)
+        setup      clipping, culling, screen mapping (Renderer.assemble)
+        raster     edge functions, depth test and depth writes (a depth only
+                   pass, draw_depth of the backend)
+        shading    the rest of a full rasterization: varying interpolation,
+                   the fragment shader and color writes
+        save       writing the BMP file
+    With --baseline the exit status is 1 when a stage got slower than the
+    baseline by more than --threshold (relative) and --min-delta (seconds).
+    --save-baseline writes the results as the new baseline. The committed
+    benchmarks/baseline.json holds the quick preset, save a new one when
+    comparing on a different machine. No window is opened, so it runs
+    headless.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from types import SimpleNamespace
+
+from src.vmath import Vec2, Vec3
+from src.camera import PerspectiveCam
+from src.renderer import Renderer, CULL_NONE
+from src.tiled import draw_tiled, _sum_counts
+from src import raster, raster_numpy
+
+from .scenes import sphere, soup
+
+
+PI = 3.141592
+
+STAGES = ("transform", "setup", "raster", "shading", "save")
+
+PRESETS = {
+    "quick": ([ ("sphere", 2), ("soup", 100), ("soup", 1000) ], [ 320, 640 ]),
+    "full": ([ ("sphere", 3), ("sphere", 5), ("soup", 100), ("soup", 10000), ("soup", 1000000) ],
+             [ 320, 1280, 3840 ])
+}
+
+SCENES = { "sphere": sphere, "soup": soup }
+
+
+def vertex_shader(vertex:list) -> list:
+    return [ vertex[1] ]
+
+def fragment_shader(buffer:list) -> tuple[int]:
+    normal = buffer[1]
+    # half lambert towards the camera
+    light = 0.5 - 0.5 * normal.z
+    return (int(255 * light), int(200 * light), int(120 * light))
+
+def _batch_shader():
+    import numpy as np
+
+    def fragment_shader_batch(position, depth, varyings):
+        light = 0.5 - 0.5 * varyings[0][:, 2]
+        return (light[:, None] * np.array((255, 200, 120))).astype(np.uint8)
+
+    return fragment_shader_batch
+
+""" draw_depth
+    :params: the Renderer, triangles from assemble
+    :returns: pixel counts, the triangles drawn depth only like rasterize
+              would draw them (in tiles with workers)
+"""
+def draw_depth(renderer:Renderer, triangles:list[tuple]) -> tuple[int]:
+    backend = raster_numpy if renderer.backend == "numpy" else raster
+    framebuffer = renderer.framebuffer
+    if renderer.workers == 1:
+        rect = (0, 0, framebuffer.width, framebuffer.height)
+        return _sum_counts(
+                backend.draw_depth(p1, p2, p3, framebuffer, rect)
+                for p1, p2, p3, _, _, _ in triangles
+            )
+    # draw_tiled takes a module with draw_triangle
+    depth_only = SimpleNamespace(draw_triangle=lambda p1, p2, p3, b1, b2, b3, framebuffer, rect, shader, plan:
+                                 backend.draw_depth(p1, p2, p3, framebuffer, rect))
+    return draw_tiled(triangles, framebuffer, depth_only, None, None,
+                      renderer.workers, renderer.tile_size)
+
+""" make_renderer
+    :params: screen width (16:9), backend name, worker count
+    :returns: a Renderer looking at the unit cube from z = -4
+"""
+def make_renderer(width:int, backend:str="python", workers:int=1) -> Renderer:
+    size = Vec2(3.2, 1.8)
+    camera = PerspectiveCam(Vec3(z=-4.0), Vec3(z=1.0), Vec3(y=1.0), size, 60 * PI / 180)
+    renderer = Renderer(camera, screen_width=width, screen_height=int(width * size.y / size.x))
+    renderer.cull_mode = CULL_NONE
+    renderer.backend = backend
+    renderer.workers = workers
+    renderer.vertex_shader = vertex_shader
+    return renderer
+
+def _best(repeat:int, setup, run) -> float:
+    best = None
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return best
+
+""" run_case
+    :params: Mesh, screen width, backend, workers, repeats
+    :returns: stage name -> best time in seconds
+"""
+def run_case(mesh, width:int, backend:str, workers:int, repeat:int) -> dict[str, float]:
+    renderer = make_renderer(width, backend, workers)
+    renderer.mesh = mesh
+    renderer.init()
+    if backend == "numpy":
+        renderer.fragment_shader_batch = _batch_shader()
+    else:
+        renderer.fragment_shader = fragment_shader
+
+    stages = {}
+    stages["transform"] = _best(repeat, lambda: None, lambda: renderer.transform(mesh.triangles()))
+    cache = renderer.transform(mesh.triangles())
+    stages["setup"] = _best(repeat, lambda: None, lambda: renderer.assemble(mesh.triangles(), cache))
+    triangles = renderer.assemble(mesh.triangles(), cache)
+
+    stages["raster"] = _best(repeat, renderer.init, lambda: draw_depth(renderer, triangles))
+    full = _best(repeat, renderer.init, lambda: renderer.rasterize(triangles))
+    stages["shading"] = max(0.0, full - stages["raster"])
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "frame.bmp")
+        stages["save"] = _best(repeat, lambda: None, lambda: renderer.save_screen(path))
+    return stages
+
+""" run_all
+    :params: scenes as (name, parameter) pairs, screen widths, backend,
+             workers, repeats
+    :returns: the results document (see --out)
+"""
+def run_all(scenes:list[tuple], widths:list[int], backend:str, workers:int,
+            repeat:int, log=None) -> dict:
+    results = []
+    for name, parameter in scenes:
+        mesh = SCENES[name](parameter)
+        for width in widths:
+            stages = run_case(mesh, width, backend, workers, repeat)
+            result = {
+                "scene": f"{name}:{parameter}",
+                "triangles": mesh.triangle_count,
+                "width": width,
+                "backend": backend,
+                "workers": workers,
+                "stages": stages
+            }
+            results.append(result)
+            if log != None:
+                log(_format(result))
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results
+    }
+
+""" compare
+    :params: results and baseline documents, relative threshold, minimum
+             slowdown in seconds (below it timings are noise)
+    :returns: a list of regression messages, empty when none
+"""
+def compare(results:dict, baseline:dict, threshold:float, min_delta:float) -> list[str]:
+    base = { _key(r): r["stages"] for r in baseline["results"] }
+    regressions = []
+    for result in results["results"]:
+        old = base.get(_key(result))
+        if old == None:
+            continue
+        for stage, new_time in result["stages"].items():
+            old_time = old.get(stage)
+            if old_time == None:
+                continue
+            if new_time - old_time > min_delta and new_time > old_time * (1 + threshold):
+                regressions.append(
+                    f"{result['scene']} {result['width']}px {stage}: "
+                    f"{old_time * 1000:.1f}ms -> {new_time * 1000:.1f}ms"
+                )
+    return regressions
+
+def _key(result:dict) -> tuple:
+    return (result["scene"], result["width"], result["backend"], result["workers"])
+
+def _format(result:dict) -> str:
+    stages = "  ".join(f"{s} {result['stages'][s] * 1000:8.1f}ms" for s in STAGES)
+    return f"{result['scene']:>14} {result['triangles']:>8} tris {result['width']:>5}px  {stages}"
+
+def _parse_scenes(text:str) -> list[tuple]:
+    scenes = []
+    for item in text.split(","):
+        name, _, parameter = item.partition(":")
+        if name not in SCENES:
+            raise argparse.ArgumentTypeError(f"unknown scene: {name}")
+        scenes.append((name, int(parameter or 1)))
+    return scenes
+
+def main(argv:list[str]=None) -> int:
+    parser = argparse.ArgumentParser(description="render pipeline benchmarks")
+    parser.add_argument("--preset", choices=PRESETS, default="quick")
+    parser.add_argument("--scenes", type=_parse_scenes,
+                        help="overrides the preset, e.g. sphere:4,soup:10000")
+    parser.add_argument("--widths", type=lambda s: [ int(w) for w in s.split(",") ],
+                        help="overrides the preset, e.g. 320,1920")
+    parser.add_argument("--backend", choices=("python", "numpy"), default="python")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write the results to --baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-delta", type=float, default=0.005)
+    args = parser.parse_args(argv)
+
+    scenes, widths = PRESETS[args.preset]
+    results = run_all(args.scenes or scenes, args.widths or widths, args.backend,
+                      args.workers, args.repeat, log=print)
+
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        if args.save_baseline:
+            with open(args.baseline, "w") as file:
+                json.dump(results, file, indent=2)
+            return 0
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        for line in regressions:
+            print("regression:", line, file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import random
+from array import array
+from math import sqrt
+
+from src.vmath import Vec3
+from src.mesh import Mesh
+
+
+""" sphere
+    :params: subdivisions of an icosahedron (20 * 4^n triangles), radius
+    :returns: a Mesh with a "normal" (Vec3) attribute
+"""
+def sphere(subdivisions:int, radius:float=1.0) -> Mesh:
+    t = (1.0 + sqrt(5.0)) / 2.0
+    points = [
+        (-1,  t,  0), ( 1,  t,  0), (-1, -t,  0), ( 1, -t,  0),
+        ( 0, -1,  t), ( 0,  1,  t), ( 0, -1, -t), ( 0,  1, -t),
+        ( t,  0, -1), ( t,  0,  1), (-t,  0, -1), (-t,  0,  1)
+    ]
+    points = [ _unit(p) for p in points ]
+    faces = [
+        (0, 11, 5), (0, 5, 1), (0, 1, 7), (0, 7, 10), (0, 10, 11),
+        (1, 5, 9), (5, 11, 4), (11, 10, 2), (10, 7, 6), (7, 1, 8),
+        (3, 9, 4), (3, 4, 2), (3, 2, 6), (3, 6, 8), (3, 8, 9),
+        (4, 9, 5), (2, 4, 11), (6, 2, 10), (8, 6, 7), (9, 8, 1)
+    ]
+
+    for _ in range(subdivisions):
+        midpoints = {}
+        def midpoint(a:int, b:int) -> int:
+            key = (a, b) if a < b else (b, a)
+            i = midpoints.get(key)
+            if i == None:
+                pa, pb = points[a], points[b]
+                i = len(points)
+                points.append(_unit((pa[0] + pb[0], pa[1] + pb[1], pa[2] + pb[2])))
+                midpoints[key] = i
+            return i
+
+        split = []
+        for a, b, c in faces:
+            ab, bc, ca = midpoint(a, b), midpoint(b, c), midpoint(c, a)
+            split += [ (a, ab, ca), (b, bc, ab), (c, ca, bc), (ab, bc, ca) ]
+        faces = split
+
+    positions = array("f")
+    normals = array("f")
+    for p in points:
+        positions.extend((p[0] * radius, p[1] * radius, p[2] * radius))
+        normals.extend(p)
+    indices = array("I")
+    for f in faces:
+        indices.extend(f)
+    return Mesh(positions, indices, { "normal": (Vec3, normals) })
+
+""" soup
+    :params: number of independent triangles, edge length, seed
+    :returns: a Mesh of triangles scattered in a [-1, 1] cube with a
+              "normal" (Vec3) attribute, unit vectors of random direction
+"""
+def soup(count:int, size:float=0.1, seed:int=0) -> Mesh:
+    rng = random.Random(seed)
+    positions = array("f")
+    normals = array("f")
+    for _ in range(count):
+        center = (rng.uniform(-1, 1), rng.uniform(-1, 1), rng.uniform(-1, 1))
+        normal = _unit((rng.uniform(-1, 1), rng.uniform(-1, 1), rng.uniform(-1, 1)))
+        for _ in range(3):
+            positions.extend(c + rng.uniform(-size, size) for c in center)
+            normals.extend(normal)
+    indices = array("I", range(3 * count))
+    return Mesh(positions, indices, { "normal": (Vec3, normals) })
+
+def _unit(p:tuple[float]) -> tuple[float]:
+    length = sqrt(p[0] * p[0] + p[1] * p[1] + p[2] * p[2]) or 1.0
+    return (p[0] / length, p[1] / length, p[2] / length)
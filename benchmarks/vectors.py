@@ -0,0 +1,91 @@
+""" Vector microbenchmark, run from the repository root:
+
+        python -m benchmarks.vectors [--number N]
+
+    Prints the size of a Vec3 next to a dict backed class with the same
+    fields, and for common operations the time and the peak bytes
+    allocated per call, chained (allocating) versus fused (writing into an
+    existing vector).
+"""
+import sys
+import timeit
+import argparse
+import tracemalloc
+
+from src.vmath import Vec3, Mat4
+
+
+class _DictVec3:
+    """ what Vec3 was before __slots__, for comparison """
+    def __init__(self, x:float=0.0, y:float=0.0, z:float=0.0) -> None:
+        self.x = x
+        self.y = y
+        self.z = z
+
+def _object_size(obj) -> int:
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+""" allocated_bytes
+    :params: a function, number of calls
+    :returns: peak bytes allocated during a call, temporaries included
+"""
+def allocated_bytes(func, number:int) -> float:
+    total = 0
+    tracemalloc.start()
+    for _ in range(number):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        result = func()
+        total += tracemalloc.get_traced_memory()[1] - current
+        del result
+    tracemalloc.stop()
+    return total / number
+
+def main(argv:list[str]=None) -> int:
+    parser = argparse.ArgumentParser(description="vector microbenchmark")
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args(argv)
+    number = args.number
+
+    print(f"object size: Vec3 {_object_size(Vec3(1.0, 2.0, 3.0))} bytes, "
+          f"dict backed {_object_size(_DictVec3(1.0, 2.0, 3.0))} bytes")
+
+    a = Vec3(1.0, 2.0, 3.0)
+    b = Vec3(4.0, 5.0, 6.0)
+    c = Vec3(7.0, 8.0, 9.0)
+    out = Vec3()
+    mat = Mat4().rotate_x(0.3).translate(Vec3(1.0, 2.0, 3.0))
+    t = 0.25
+    cases = [
+        ("copy", lambda: a.copy(), None),
+        ("rotate_x", lambda: out.rotate_x(0.1), None),
+        ("lerp",
+            lambda: a.copy().scale(1 - t).add(b.copy().scale(t)),
+            lambda: out.set_lerp(a, b, t)),
+        ("barycentric",
+            lambda: a.copy().scale(0.2).add(b.copy().scale(0.3)).add(c.copy().scale(0.5)),
+            lambda: out.set_barycentric(a, b, c, 0.2, 0.3, 0.5)),
+        ("transform",
+            lambda: mat.transform_point(a),
+            lambda: mat.transform_point(a, out)),
+    ]
+
+    print(f"{'operation':<12} {'chained':>21} {'fused':>21}")
+    for name, chained, fused in cases:
+        row = f"{name:<12}"
+        for func in (chained, fused):
+            if func == None:
+                row += f" {'':>21}"
+                continue
+            seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+            size = allocated_bytes(func, min(number, 10000))
+            row += f" {seconds * 1e9:8.0f}ns {size:6.0f} bytes"
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
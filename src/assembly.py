@@ -0,0 +1,81 @@
+from .vmath import Vec2, Vec3
+
+# cull_mode: winding on screen (y pointing up) of the triangles to drop
+CULL_NONE = "none"
+CULL_CW   = "cw"
+CULL_CCW  = "ccw"
+
+
+def lerp(v1:float, v2:float, t:float) -> float:
+    return (1 - t) * v1 + t * v2
+
+def lerp_buffer(b1:list, b2:list, t:float) -> list:
+    buffer = []
+    for e1, e2 in zip(b1, b2):
+        if isinstance(e1, float):
+            e = lerp(e1, e2, t)
+        elif isinstance(e1, int):
+            e = int(lerp(e1, e2, t))
+        elif isinstance(e1, Vec2):
+            e = Vec2().set_lerp(e1, e2, t)
+        elif isinstance(e1, Vec3):
+            e = Vec3().set_lerp(e1, e2, t)
+        else:
+            e = e1
+        buffer.append(e)
+    return buffer
+
+def is_culled(p1:Vec3, p2:Vec3, p3:Vec3, cull_mode:str) -> bool:
+    if cull_mode == CULL_NONE:
+        return False
+    area = (p2.x - p1.x) * (p3.y - p1.y) - (p2.y - p1.y) * (p3.x - p1.x)
+    if cull_mode == CULL_CCW:
+        return area > 0
+    if cull_mode == CULL_CW:
+        return area < 0
+    raise ValueError(f"unknown cull mode: {cull_mode}")
+
+# clips the polygon to the side of the plane z = limit given by sign
+# (1: keep z >= limit, -1: keep z <= limit)
+def _clip_plane(polygon:list, limit:float, sign:int) -> list:
+    result = []
+    count = len(polygon)
+    for i in range(count):
+        a = polygon[i]
+        b = polygon[(i + 1) % count]
+        da = sign * (a[0].z - limit)
+        db = sign * (b[0].z - limit)
+        if da >= 0:
+            result.append(a)
+        if (da >= 0) != (db >= 0):
+            t = da / (da - db)
+            view = Vec3(
+                    lerp(a[0].x, b[0].x, t),
+                    lerp(a[0].y, b[0].y, t),
+                    limit
+                )
+            result.append((view, None, lerp_buffer(a[2], b[2], t)))
+    return result
+
+""" clip_triangle
+    :params: three vertices (view position, screen position, buffer) and
+             the near and far distance
+    :returns: list of triangles (tuples of three vertices) inside of the
+              near and far planes, clipped vertices have no screen position
+"""
+def clip_triangle(v1:tuple, v2:tuple, v3:tuple, near:float, far:float) -> list[tuple]:
+    z1, z2, z3 = v1[0].z, v2[0].z, v3[0].z
+    if z1 < near and z2 < near and z3 < near:
+        return []
+    if z1 > far and z2 > far and z3 > far:
+        return []
+    if (z1 >= near and z2 >= near and z3 >= near and
+        z1 <= far and z2 <= far and z3 <= far):
+        return [ (v1, v2, v3) ]
+
+    polygon = _clip_plane([ v1, v2, v3 ], near, 1)
+    polygon = _clip_plane(polygon, far, -1)
+    return [
+        (polygon[0], polygon[i], polygon[i + 1])
+        for i in range(1, len(polygon) - 1)
+    ]
@@ -1,53 +1,99 @@
 import struct
 
-def make_bitmap(file_path:str, width:int, height:int, pixel_data:list[int]):
+# BM header (14 bytes) followed by the BITMAPINFOHEADER (40 bytes)
+_HEADER = struct.Struct("<2sIHHI" "IiiHHIIiiII")
+
+def write_bitmap(file, width:int, height:int, pixel_data, stride:int=None) -> None:
+    """ file: a binary file object
+        pixel_data: any buffer of 24 bit BGR pixels, first row at the bottom
+        stride: bytes from one row to the next in pixel_data (default packed)
+    """
+    row_size = width * 3
+    if stride == None:
+        stride = row_size
+    pad = (4 - row_size % 4) % 4
+    data_size = (row_size + pad) * height
+
+    file.write(_HEADER.pack(
+            b"BM",                          #   ID field
+            54 + data_size,                 #   size of BMP file
+            0, 0,                           #   unused, app specific
+            54,                             #   offset to pixel array
+            40,                             #   DIB header size
+            width,                          #   width (L->R) in pixels
+            height,                         #   height (B->U), positive bottom -> top
+            1,                              #   number of color planes
+            24,                             #   bits per pixel
+            0,                              #   BI_RGB, no pixel array compression
+            data_size,                      #   size of raw bmp data (including padding)
+            2835, 2835,                     #   print resolution (pixels per meter), 72 DPI
+            0,                              #   number of colors in palette
+            0                               #   number of important colors
+        ))
+
+    view = memoryview(pixel_data).cast("B")
+    if pad == 0 and stride == row_size:
+        file.write(view[:data_size])
+        return
+
+    padding = bytes(pad)
+    for i in range(height):
+        start = i * stride
+        file.write(view[start:start + row_size])
+        if pad:
+            file.write(padding)
+
+def make_bitmap(file_path:str, width:int, height:int, pixel_data, stride:int=None):
+    """ pixel_data: BGR bytes as a buffer (bytes, bytearray, array, numpy)
+                    or a list of ints
+    """
+    if isinstance(pixel_data, list):
+        pixel_data = bytes(pixel_data)
     with open(file_path, "wb") as file:
-        pad = 0
-        if (width * 3) % 4 != 0:
-           pad = 4 - (width * 3) % 4 
-        row = width * 3 + pad
-        data_size = row * height
-        file_size = data_size + 54  # header=54b
-
-        # insert padding
-        pixel_array = []
-        for i in range(height):
-            start = i * width * 3
-            end = (i + 1) * width * 3
-            pixel_array.extend(pixel_data[start:end])
-            pixel_array.extend([0]*pad)
-
-        # BMP header
-        file.write(bytearray([0x42, 0x4d]))             #   2   BM              ID field
-        file.write(struct.pack("i", file_size))         #   4   54 + data       size of BMP file
-        file.write(bytearray([0x00, 0x00]))             #   2   Unused          App specific
-        file.write(bytearray([0x00, 0x00]))             #   2   Unused          App specific
-        file.write(bytearray([0x36, 0x00, 0x00, 0x00])) #   4   54B (14+40)     offset to pixel array
-
-        # DIB header
-        file.write(bytearray([0x28, 0x00, 0x00, 0x00])) #   4   40B             DIB header size
-        file.write(struct.pack("i", width))             #   4   width (L->R)   BMP width in pixels
-        file.write(struct.pack("i", height))            #   4   height (B->U)  BMP height in pixels (positive bottom -> top)
-        file.write(bytearray([0x01, 0x00]))             #   2   1 plane         number of color planes
-        file.write(bytearray([0x18, 0x00]))             #   2   24 bpp          number of bits per pixel 
-        file.write(bytearray([0x00, 0x00, 0x00, 0x00])) #   4   0               BI_RGB, no pixel array compression
-        file.write(struct.pack("i", data_size))         #   4   data            size of raw bmp data (including padding)
-        # 72 DPI
-        file.write(bytearray([0x13, 0x0b, 0x00, 0x00])) #   4   2835ppm         horizontal print resolution (pixels per meter)
-        file.write(bytearray([0x13, 0x0b, 0x00, 0x00])) #   4   2835ppm         vertical print resolution (pixels per meter)
-        file.write(bytearray([0x00, 0x00, 0x00, 0x00])) #   4   0 colors        number of colors in palette
-        file.write(bytearray([0x00, 0x00, 0x00, 0x00])) #   4   0 all           number of important colors
-
-        # pixel array
-        file.write(bytearray(pixel_array))
+        write_bitmap(file, width, height, pixel_data, stride)
+
+def read_bitmap(file_path:str) -> tuple[int, int, bytearray]:
+    """ reads an uncompressed 24 or 32 bit BMP file (as written by
+        make_bitmap, or with alpha which is dropped)
+        returns: (width, height, pixel_data), pixel_data packed 24 bit BGR
+                 with the first row at the bottom, like write_bitmap takes
+    """
+    with open(file_path, "rb") as file:
+        data = file.read()
+    if len(data) < _HEADER.size or data[:2] != b"BM":
+        raise ValueError(f"not a BMP file: {file_path}")
+    (_, _, _, _, offset, _, width, height, _, bits, compression,
+     _, _, _, _, _) = _HEADER.unpack_from(data)
+    # BI_RGB, or BI_BITFIELDS with the usual BGRA masks for 32 bit
+    if bits not in (24, 32) or compression not in (0, 3):
+        raise ValueError(f"unsupported BMP: {bits} bits, compression {compression}")
+
+    top_down = height < 0
+    height = abs(height)
+    step = bits // 8
+    stride = (width * step + 3) & ~3
+    row_size = width * 3
+    pixel_data = bytearray(row_size * height)
+    view = memoryview(data)
+    for i in range(height):
+        start = offset + i * stride
+        row = (height - 1 - i) if top_down else i
+        if step == 3:
+            pixel_data[row * row_size:(row + 1) * row_size] = view[start:start + row_size]
+        else:
+            target = row * row_size
+            source = view[start:start + width * 4]
+            pixel_data[target:target + row_size:3] = source[0::4]
+            pixel_data[target + 1:target + row_size:3] = source[1::4]
+            pixel_data[target + 2:target + row_size:3] = source[2::4]
+    return (width, height, pixel_data)
 
 
 if __name__ == "__main__":
     width = 0xff
     height = 0xff
-    pixel_data = []
+    pixel_data = bytearray()
     for r in range(height):
         for g in range(width):
             pixel_data.extend([0x00, g, r])
     make_bitmap("test.bmp", width, height, pixel_data)
-
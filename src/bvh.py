@@ -0,0 +1,159 @@
+from .vmath import Vec3
+from .mesh import Mesh
+from .camera import Camera
+
+
+class BVH:
+    """ Bounding volume hierarchy over the triangles of a Mesh, for
+        skipping off screen triangles without transforming their vertices.
+        It only depends on the mesh, so it stays valid when the camera
+        moves. After the positions changed (in place, same triangles) call
+        refit, which keeps the tree and updates the bounds.
+        Nodes are stored in flat lists, children after their parent:
+            bounds: min x, y, z, max x, y, z per node
+            children: (left, right) or None for leaves
+            spans: (start, end) into order for leaves
+    """
+    def __init__(self, mesh:Mesh, leaf_size:int=8) -> None:
+        self.mesh = mesh
+        self.leaf_size = leaf_size
+        self.bounds = []
+        self.children = []
+        self.spans = []
+        self.order = []  # triangle numbers, grouped by leaf
+        self._build()
+
+    def _triangle_bounds(self, t:int) -> list[float]:
+        p = self.mesh.positions
+        idx = self.mesh.indices
+        i1, i2, i3 = 3 * idx[3 * t], 3 * idx[3 * t + 1], 3 * idx[3 * t + 2]
+        return [
+            min(p[i1], p[i2], p[i3]), min(p[i1 + 1], p[i2 + 1], p[i3 + 1]), min(p[i1 + 2], p[i2 + 2], p[i3 + 2]),
+            max(p[i1], p[i2], p[i3]), max(p[i1 + 1], p[i2 + 1], p[i3 + 1]), max(p[i1 + 2], p[i2 + 2], p[i3 + 2])
+        ]
+
+    # top down, split at the median of the triangle centers along the
+    # longest axis of the node
+    def _build(self) -> None:
+        count = self.mesh.triangle_count
+        boxes = [ self._triangle_bounds(t) for t in range(count) ]
+        centers = [ ((b[0] + b[3]) / 2, (b[1] + b[4]) / 2, (b[2] + b[5]) / 2) for b in boxes ]
+        self.order = list(range(count))
+        if count == 0:
+            return
+
+        stack = [ (self._new_node(), 0, count) ]
+        while stack:
+            node, start, end = stack.pop()
+            box = _union(boxes[t] for t in self.order[start:end])
+            self.bounds[node] = box
+            if end - start <= self.leaf_size:
+                self.spans[node] = (start, end)
+                continue
+
+            axis = max(range(3), key=lambda a: box[a + 3] - box[a])
+            part = sorted(self.order[start:end], key=lambda t: centers[t][axis])
+            self.order[start:end] = part
+            middle = (start + end) // 2
+            left = self._new_node()
+            right = self._new_node()
+            self.children[node] = (left, right)
+            stack.append((right, middle, end))
+            stack.append((left, start, middle))
+
+    def _new_node(self) -> int:
+        self.bounds.append(None)
+        self.children.append(None)
+        self.spans.append(None)
+        return len(self.bounds) - 1
+
+    def refit(self) -> None:
+        """ updates the bounds to the current mesh positions """
+        for node in range(len(self.bounds) - 1, -1, -1):
+            children = self.children[node]
+            if children == None:
+                start, end = self.spans[node]
+                self.bounds[node] = _union(self._triangle_bounds(t) for t in self.order[start:end])
+            else:
+                self.bounds[node] = _union(self.bounds[c] for c in children)
+
+    """ visible_triangles
+        :params: the camera, margin added to the frustum (camera units)
+        :returns: (i1, i2, i3) of the triangles that may be visible, in
+                  mesh order
+    """
+    def visible_triangles(self, camera:Camera, margin:float=0.0) -> list[tuple[int]]:
+        idx = self.mesh.indices
+        return [
+            (int(idx[3 * t]), int(idx[3 * t + 1]), int(idx[3 * t + 2]))
+            for t in self.visible(camera, margin)
+        ]
+
+    """ visible
+        :params: the camera, margin added to the frustum (camera units)
+        :returns: numbers of the triangles that may be visible, ascending
+    """
+    def visible(self, camera:Camera, margin:float=0.0) -> list[int]:
+        if not self.bounds:
+            return []
+        planes = world_planes(camera, margin)
+        found = []
+        # planes a node is entirely inside of are not tested for its children
+        stack = [ (0, planes) ]
+        while stack:
+            node, active = stack.pop()
+            box = self.bounds[node]
+            remaining = []
+            for nx, ny, nz, d in active:
+                # the box corners farthest and least far along the normal
+                high = (nx * (box[3] if nx > 0 else box[0]) +
+                        ny * (box[4] if ny > 0 else box[1]) +
+                        nz * (box[5] if nz > 0 else box[2]) + d)
+                if high < 0:
+                    break
+                low = (nx * (box[0] if nx > 0 else box[3]) +
+                       ny * (box[1] if ny > 0 else box[4]) +
+                       nz * (box[2] if nz > 0 else box[5]) + d)
+                if low < 0:
+                    remaining.append((nx, ny, nz, d))
+            else:
+                children = self.children[node]
+                if children == None:
+                    start, end = self.spans[node]
+                    found += self.order[start:end]
+                else:
+                    stack.append((children[1], remaining))
+                    stack.append((children[0], remaining))
+
+        found.sort()
+        return found
+
+""" world_planes
+    :params: the camera, margin added to the frustum (camera units)
+    :returns: Camera.frustum_planes in world space as (nx, ny, nz, d)
+"""
+def world_planes(camera:Camera, margin:float=0.0) -> list[tuple[float]]:
+    view = camera.view_matrix().m
+    pos = camera.pos
+    planes = []
+    for n, d in camera.frustum_planes(margin):
+        # view = R (p - pos), so n . view = (R^T n) . (p - pos)
+        w = Vec3(
+                view[0] * n.x + view[4] * n.y + view[8] * n.z,
+                view[1] * n.x + view[5] * n.y + view[9] * n.z,
+                view[2] * n.x + view[6] * n.y + view[10] * n.z
+            )
+        planes.append((w.x, w.y, w.z, d - w.dot(pos)))
+    return planes
+
+def _union(boxes) -> list[float]:
+    x0 = y0 = z0 = float("inf")
+    x1 = y1 = z1 = float("-inf")
+    for b in boxes:
+        x0 = min(x0, b[0])
+        y0 = min(y0, b[1])
+        z0 = min(z0, b[2])
+        x1 = max(x1, b[3])
+        y1 = max(y1, b[4])
+        z1 = max(z1, b[5])
+    return [ x0, y0, z0, x1, y1, z1 ]
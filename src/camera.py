@@ -1,16 +1,82 @@
-from math import tan
+from math import tan, sqrt, inf
 
-from .vmath import Vec2, Vec3, Mat3
+from .vmath import Vec2, Vec3, Mat4
+
+def _as_array(vec:Vec3):
+    import numpy as np
+    return np.array([vec.x, vec.y, vec.z])
 
 class Camera:
-    def __init__(self, pos:Vec3, normal:Vec3, up:Vec3, size:Vec2) -> None:
+    def __init__(self, pos:Vec3, normal:Vec3, up:Vec3, size:Vec2,
+                 near:float=0.0, far:float=inf) -> None:
         self.pos = pos
         self.normal = normal
         self.up = up
         self.size = size
+        # clip planes, distance from pos along normal
+        self.near = near
+        self.far = far
+        self._key = None
 
-    def world_to_screen(self, point:Vec3) -> Vec2 | None:
-        return None
+    def world_to_screen(self, point:Vec3) -> Vec3 | None:
+        self._update()
+        return self._project(self._to_view(point))
+
+    def world_to_screen_many(self, points) -> list[Vec3]:
+        """ points: list of Vec3 or a numpy (N, 3) array (returns the same) """
+        return self.view_to_screen_many(self.world_to_view_many(points))
+
+    def world_to_view(self, point:Vec3) -> Vec3:
+        self._update()
+        return self._to_view(point)
+
+    def world_to_view_many(self, points) -> list[Vec3]:
+        self._update()
+        if not isinstance(points, list):
+            return self._to_view_array(points)
+        to_view = self._to_view
+        return [ to_view(point) for point in points ]
+
+    def view_to_screen_many(self, views) -> list[Vec3]:
+        self._update()
+        if not isinstance(views, list):
+            return self._project_array(views)
+        project = self._project
+        return [ project(view) for view in views ]
+
+    # view: position in the camera frame, z is the distance along normal
+    def view_to_screen(self, view:Vec3) -> Vec3 | None:
+        self._update()
+        return self._project(view)
+
+    def view_matrix(self) -> Mat4:
+        """ the world to view transform """
+        self._update()
+        return Mat4.from_rows([
+                (u.x, u.y, u.z, -u.dot(self.pos)) for u in (self._ux, self._uy, self._uz)
+            ])
+
+    """ frustum_planes
+        :params: margin added to the half width and height (camera units)
+        :returns: planes as (normal, d) in view space, a point is outside
+                  when normal.dot(point) + d < 0 for any of them
+    """
+    # Conservative: everything outside of the planes is off screen, not
+    # everything inside is on screen. The side planes are only given when
+    # up is perpendicular to normal, otherwise just near and far.
+    def frustum_planes(self, margin:float=0.0) -> list[tuple]:
+        self._update()
+        planes = [ (Vec3(0.0, 0.0, 1.0), -self.near) ]
+        if self.far != inf:
+            planes.append((Vec3(0.0, 0.0, -1.0), self.far))
+        # c_yx is (0, 0, -1) in view space when up is perpendicular
+        if abs(self._c_yx.x) > 1e-9 or abs(self._c_yx.y) > 1e-9:
+            return planes
+        planes += self._side_planes(self.size.x / 2 + margin, self.size.y / 2 + margin)
+        return planes
+
+    def _side_planes(self, half_x:float, half_y:float) -> list[tuple]:
+        return []
 
     def is_visible(self, screen_point:Vec3) -> bool:
         # if camera is not looking
@@ -25,44 +91,156 @@ class Camera:
 
         return True
 
-    def _world_to_screen(self, point:Vec3, line:Vec3) -> Vec2:
-        vn = self.normal.normalize()
+    def _get_key(self) -> tuple:
+        return (
+                self.pos.x, self.pos.y, self.pos.z,
+                self.normal.x, self.normal.y, self.normal.z,
+                self.up.x, self.up.y, self.up.z,
+                self.size.x, self.size.y
+            )
+
+    # Rebuilds the cached transforms when pos, normal, up or size changed,
+    # either by assignment or in place. Per point this is one tuple compare
+    # instead of building and inverting the camera basis.
+    def _update(self) -> None:
+        key = self._get_key()
+        if key == self._key:
+            return
+        self._key = key
+
+        vn = self.normal.copy()\
+                        .normalize()
         vy = self.up.copy()\
                     .normalize()
         vx = vy.cross(vn)\
                .normalize()
-        vd = line.copy()\
-                 .normalize()
-        mat = Mat3(
-                vd.scale(-1),
-                vy,
-                vx
-            ).invert()
-        pc = point.copy().sub(self.pos)
-        vec3 = mat.transpose()\
-                  .mult_vec(pc)
-        return Vec3(-vec3.z, -vec3.y, -vec3.x)
+
+        # view space: orthonormal camera frame with z along the normal
+        self._ux = vx
+        self._uy = vn.cross(vx)
+        self._uz = vn
+
+        # The screen position is the camera basis (w, vy, vx) solved for
+        # the point, w being the direction the point is projected along.
+        # By Cramer's rule that only needs these cross products, which are
+        # kept in view space.
+        self._c_yx = self._rotate(vy.cross(vx))
+        self._c_xn = self._rotate(vx.cross(vn))
+        self._c_ny = self._rotate(vn.cross(vy))
+        self._build()
+
+    def _build(self) -> None:
+        pass
+
+    def _rotate(self, vec:Vec3) -> Vec3:
+        return Vec3(vec.dot(self._ux), vec.dot(self._uy), vec.dot(self._uz))
+
+    def _to_view(self, point:Vec3) -> Vec3:
+        dx = point.x - self.pos.x
+        dy = point.y - self.pos.y
+        dz = point.z - self.pos.z
+        ux, uy, uz = self._ux, self._uy, self._uz
+        return Vec3(
+                ux.x * dx + ux.y * dy + ux.z * dz,
+                uy.x * dx + uy.y * dy + uy.z * dz,
+                uz.x * dx + uz.y * dy + uz.z * dz
+            )
+
+    def _to_view_array(self, points):
+        return self.view_matrix().transform_points(points)
+
+    def _project(self, view:Vec3) -> Vec3 | None:
+        return None
+
+    def _project_array(self, view):
+        return None
 
 class OrthographicCam(Camera):
-    def __init__(self, pos:Vec3, normal:Vec3, up:Vec3, size:Vec2) -> None:
-        super().__init__(pos, normal, up, size)
+    def __init__(self, pos:Vec3, normal:Vec3, up:Vec3, size:Vec2,
+                 near:float=0.0, far:float=inf) -> None:
+        super().__init__(pos, normal, up, size, near, far)
+
+    def _build(self) -> None:
+        # projecting along the normal, w = (0, 0, 1) in view space
+        det = self._c_yx.z
+        s = -1 / (det * det)
+        self._sx = self._c_ny.copy().scale(s)
+        self._sy = self._c_xn.copy().scale(s)
+        self._sz = self._c_yx.copy().scale(s)
+
+    def _project(self, view:Vec3) -> Vec3 | None:
+        return Vec3(self._sx.dot(view), self._sy.dot(view), self._sz.dot(view))
+
+    def _side_planes(self, half_x:float, half_y:float) -> list[tuple]:
+        # the screen position is the view x, y
+        return [
+            (Vec3(-1.0, 0.0, 0.0), half_x), (Vec3(1.0, 0.0, 0.0), half_x),
+            (Vec3(0.0, -1.0, 0.0), half_y), (Vec3(0.0, 1.0, 0.0), half_y)
+        ]
 
-    def world_to_screen(self, point:Vec3) -> Vec2 | None:
-        return self._world_to_screen(point, self.normal.copy().scale(-1))
+    def _project_array(self, view):
+        import numpy as np
+        return np.stack((
+                view @ _as_array(self._sx),
+                view @ _as_array(self._sy),
+                view @ _as_array(self._sz)
+            ), axis=1)
 
 class PerspectiveCam(Camera):
-    def __init__(self, pos:Vec3, normal:Vec3, up:Vec3, size:Vec2, fov_rad:float) -> None:
-        super().__init__(pos, normal, up, size)
+    def __init__(self, pos:Vec3, normal:Vec3, up:Vec3, size:Vec2, fov_rad:float,
+                 near:float=0.0, far:float=inf) -> None:
+        super().__init__(pos, normal, up, size, near, far)
         self.fov_rad = fov_rad
 
-    def world_to_screen(self, point:Vec3) -> Vec2 | None:
-        dist = self.size.x / (2 * tan(self.fov_rad / 2))
-        vfp = self.normal.copy()\
-                         .normalize()\
-                         .scale(-dist)
-        fp = self.pos.copy()\
-                     .add(vfp)
-        line = fp.copy()\
-                 .sub(point)
-        return self._world_to_screen(point, line)
+    def _get_key(self) -> tuple:
+        return super()._get_key() + (self.fov_rad,)
+
+    def _build(self) -> None:
+        # distance of the focal point behind pos
+        self._dist = self.size.x / (2 * tan(self.fov_rad / 2))
+        self._e0 = self._dist * self._c_yx.z
+
+    # With g = view + (0, 0, dist), the vector from the focal point to the
+    # point, the projection direction is w = g / |g|.
+    def _project(self, view:Vec3) -> Vec3 | None:
+        c_yx, c_xn, c_ny = self._c_yx, self._c_xn, self._c_ny
+        dist = self._dist
+        e = c_yx.x * view.x + c_yx.y * view.y + c_yx.z * view.z
+        gz = view.z + dist
+        gg = view.x * view.x + view.y * view.y + gz * gz
+        den = e + self._e0
+        den *= den
+        s = -dist * sqrt(gg) / den
+        return Vec3(
+                s * (c_ny.x * view.x + c_ny.y * view.y + c_ny.z * view.z),
+                s * (c_xn.x * view.x + c_xn.y * view.y + c_xn.z * view.z),
+                -e * gg / den
+            )
+
+    # The screen position is dist * (x, y) / gz * |g| / gz, a pinhole
+    # projection scaled by |g| / gz >= 1, so the pinhole frustum contains
+    # everything on screen. Only valid in front of the focal point.
+    def _side_planes(self, half_x:float, half_y:float) -> list[tuple]:
+        dist = self._dist
+        if self.near <= -dist:
+            return []
+        return [
+            (Vec3(-dist, 0.0, half_x), half_x * dist), (Vec3(dist, 0.0, half_x), half_x * dist),
+            (Vec3(0.0, -dist, half_y), half_y * dist), (Vec3(0.0, dist, half_y), half_y * dist)
+        ]
 
+    def _project_array(self, view):
+        import numpy as np
+        dist = self._dist
+        e = view @ _as_array(self._c_yx)
+        g = view.copy()
+        g[:, 2] += dist
+        gg = np.einsum("ij,ij->i", g, g)
+        den = e + self._e0
+        den *= den
+        s = -dist * np.sqrt(gg) / den
+        return np.stack((
+                s * (view @ _as_array(self._c_ny)),
+                s * (view @ _as_array(self._c_xn)),
+                -e * gg / den
+            ), axis=1)
@@ -0,0 +1,79 @@
+from array import array
+from math import inf
+
+
+class Framebuffer:
+    """ depth: float32 per pixel, cleared to +inf
+        color: packed 24 bit pixels in BMP byte order (blue, green, red)
+        both are row major, first row at the bottom of the image (like BMP)
+    """
+    def __init__(self, width:int, height:int, back_fill:tuple[int]=(0x00, 0x00, 0x00)) -> None:
+        self.width = width
+        self.height = height
+        self.back_fill = back_fill  # RGB (max 255)
+        self.depth = array("f", bytes(4 * width * height))
+        self.color = bytearray(3 * width * height)
+        self.clear()
+
+    @classmethod
+    def from_buffers(cls, width:int, height:int, depth, color,
+                     back_fill:tuple[int]=(0x00, 0x00, 0x00)):
+        """ wraps existing writable buffers (e.g. shared memory) without
+            clearing them, depth holds float32 values
+        """
+        framebuffer = cls.__new__(cls)
+        framebuffer.width = width
+        framebuffer.height = height
+        framebuffer.back_fill = back_fill
+        framebuffer.depth = memoryview(depth).cast("B").cast("f")
+        framebuffer.color = memoryview(color).cast("B")
+        return framebuffer
+
+    def clear(self) -> None:
+        size = self.width * self.height
+        if size == 0:
+            return
+        depth = memoryview(self.depth)
+        depth[0] = inf
+        _fill(depth, 1, size)
+        r, g, b = self.back_fill
+        color = memoryview(self.color)
+        color[0:3] = bytes((b, g, r))
+        _fill(color, 3, 3 * size)
+
+    def clear_rect(self, x0:int, y0:int, x1:int, y1:int) -> None:
+        """ clears the pixels x0 <= x < x1, y0 <= y < y1 """
+        if x0 >= x1 or y0 >= y1:
+            return
+        width = self.width
+        n = x1 - x0
+        first = y0 * width + x0
+        depth = memoryview(self.depth)
+        depth[first] = inf
+        _fill(depth[first:first + n], 1, n)
+        r, g, b = self.back_fill
+        color = memoryview(self.color)
+        color[3 * first:3 * first + 3] = bytes((b, g, r))
+        _fill(color[3 * first:3 * (first + n)], 3, 3 * n)
+        for start in range(first + width, y1 * width, width):
+            depth[start:start + n] = depth[first:first + n]
+            color[3 * start:3 * (start + n)] = color[3 * first:3 * (first + n)]
+
+    def depth_array(self):
+        """ numpy (height, width) float32 view of depth, no copy """
+        import numpy as np
+        return np.frombuffer(self.depth, dtype=np.float32)\
+                 .reshape(self.height, self.width)
+
+    def color_array(self):
+        """ numpy (height, width, 3) uint8 view of color (BGR), no copy """
+        import numpy as np
+        return np.frombuffer(self.color, dtype=np.uint8)\
+                 .reshape(self.height, self.width, 3)
+
+# buffer[:filled] holds the pattern, copy it onto itself in doubling blocks
+def _fill(buffer:memoryview, filled:int, size:int) -> None:
+    while filled < size:
+        n = min(filled, size - filled)
+        buffer[filled:filled + n] = buffer[:n]
+        filled += n
@@ -0,0 +1,94 @@
+from .framebuffer import Framebuffer
+
+
+def nearest_depth(triangle:tuple) -> float:
+    """ sort key of (p1, p2, p3, b1, b2, b3) triangles, front to back """
+    return min(triangle[0].z, triangle[1].z, triangle[2].z)
+
+
+class DepthTiles:
+    """ The farthest stored depth of each tile_size x tile_size block of a
+        framebuffer region, a one level depth pyramid. A triangle whose
+        nearest corner is behind the farthest depth of every block it
+        touches can't pass the depth test anywhere, so it is skipped
+        without being rasterized.
+    """
+    def __init__(self, framebuffer:Framebuffer, rect:tuple[int], tile_size:int=8) -> None:
+        self.framebuffer = framebuffer
+        self.rect = rect  # (x0, y0, x1, y1), exclusive maximum
+        self.tile_size = tile_size
+        self.columns = (rect[2] - rect[0] + tile_size - 1) // tile_size
+        rows = (rect[3] - rect[1] + tile_size - 1) // tile_size
+        self.far = [ 0.0 ] * (self.columns * rows)
+        # the framebuffer may already hold depth from earlier draws
+        self.refresh(rect[0], rect[1], rect[2] - 1, rect[3] - 1)
+
+    def _tiles(self, x0:int, y0:int, x1:int, y1:int):
+        """ tiles overlapping the inclusive pixel rectangle, clipped to rect """
+        rx0, ry0, rx1, ry1 = self.rect
+        s = self.tile_size
+        x0 = max(x0, rx0) - rx0
+        y0 = max(y0, ry0) - ry0
+        x1 = min(x1, rx1 - 1) - rx0
+        y1 = min(y1, ry1 - 1) - ry0
+        if x0 > x1 or y0 > y1:
+            return range(0), range(0)
+        return range(y0 // s, y1 // s + 1), range(x0 // s, x1 // s + 1)
+
+    def refresh(self, x0:int, y0:int, x1:int, y1:int) -> None:
+        """ recomputes the tiles overlapping the inclusive pixel rectangle """
+        rx0, ry0, rx1, ry1 = self.rect
+        s = self.tile_size
+        width = self.framebuffer.width
+        depth = self.framebuffer.depth
+        ty_range, tx_range = self._tiles(x0, y0, x1, y1)
+        for ty in ty_range:
+            py0 = ry0 + ty * s
+            py1 = min(py0 + s, ry1)
+            for tx in tx_range:
+                px0 = rx0 + tx * s
+                px1 = min(px0 + s, rx1)
+                self.far[ty * self.columns + tx] = max(
+                        max(depth[row + px0:row + px1])
+                        for row in range(py0 * width, py1 * width, width)
+                    )
+
+    def is_occluded(self, x0:int, y0:int, x1:int, y1:int, z:float) -> bool:
+        """ True when depth z is behind every tile of the pixel rectangle """
+        far = self.far
+        columns = self.columns
+        ty_range, tx_range = self._tiles(x0, y0, x1, y1)
+        for ty in ty_range:
+            n = ty * columns
+            for tx in tx_range:
+                if z <= far[n + tx]:
+                    return False
+        return True
+
+""" draw_triangles
+    :params: triangles as (p1, p2, p3, b1, b2, b3), the framebuffer, the
+             clip rectangle, the backend's draw_triangle, its fragment
+             shader and VaryingPlan
+    :returns: pixel counts (tested, covered, shaded)
+"""
+# Triangles entirely behind the depth already drawn are skipped, this pays
+# off when they are sorted front to back (see nearest_depth).
+def draw_triangles(triangles:list[tuple], framebuffer:Framebuffer, rect:tuple[int],
+                   draw_triangle, shader, plan=None) -> tuple[int]:
+    tiles = DepthTiles(framebuffer, rect)
+    tested = covered = shaded = 0
+    for triangle in triangles:
+        p1, p2, p3, b1, b2, b3 = triangle
+        x0 = min(p1.x, p2.x, p3.x)
+        y0 = min(p1.y, p2.y, p3.y)
+        x1 = max(p1.x, p2.x, p3.x)
+        y1 = max(p1.y, p2.y, p3.y)
+        if tiles.is_occluded(x0, y0, x1, y1, nearest_depth(triangle)):
+            continue
+        t, c, s = draw_triangle(p1, p2, p3, b1, b2, b3, framebuffer, rect, shader, plan)
+        tested += t
+        covered += c
+        shaded += s
+        if s:
+            tiles.refresh(x0, y0, x1, y1)
+    return (tested, covered, shaded)
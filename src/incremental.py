@@ -0,0 +1,82 @@
+from .mesh import Mesh
+from .framebuffer import Framebuffer
+from .tiled import triangle_tiles, tile_rect
+
+
+class RetainedFrame:
+    """ What the last render drew, for Renderer.rerender: the assembled
+        triangles of every mesh triangle and for every screen tile the
+        mesh triangles touching it. Redrawing a tile's triangles in mesh
+        order into the cleared tile gives the pixels of a full render.
+        parts: mesh triangle -> [(p1, p2, p3, b1, b2, b3), ...] after
+               clipping and culling
+        tiles: (tile x, tile y) -> set of mesh triangles
+    """
+    def __init__(self, mesh:Mesh, framebuffer:Framebuffer, tile_size:int) -> None:
+        self.mesh = mesh
+        self.framebuffer = framebuffer
+        self.tile_size = tile_size
+        self.parts = {}
+        self.tiles = {}
+        self._vertex_triangles = None
+
+    def _tiles_of(self, parts:list[tuple]) -> set[tuple[int]]:
+        width, height = self.framebuffer.width, self.framebuffer.height
+        keys = set()
+        for p1, p2, p3, _, _, _ in parts:
+            keys.update(triangle_tiles(p1, p2, p3, width, height, self.tile_size))
+        return keys
+
+    """ replace
+        :params: mesh triangles that were assembled again, the mesh
+                 triangle of each of the new triangles, the new triangles
+        :returns: tiles the old or the new triangles touch
+    """
+    def replace(self, numbers, sources:list[int], triangles:list[tuple]) -> set[tuple[int]]:
+        dirty = set()
+        for t in numbers:
+            old = self._tiles_of(self.parts.pop(t, ()))
+            for key in old:
+                self.tiles[key].discard(t)
+            dirty |= old
+
+        added = {}
+        for t, triangle in zip(sources, triangles):
+            parts = added.get(t)
+            if parts == None:
+                added[t] = parts = []
+            parts.append(triangle)
+        for t, parts in added.items():
+            self.parts[t] = parts
+            new = self._tiles_of(parts)
+            for key in new:
+                tile = self.tiles.get(key)
+                if tile == None:
+                    self.tiles[key] = tile = set()
+                tile.add(t)
+            dirty |= new
+        return dirty
+
+    def vertex_triangles(self, vertices) -> set[int]:
+        """ the mesh triangles using any of the vertices """
+        if self._vertex_triangles == None:
+            # built on first use, the indices don't change while retained
+            using = [ [] for _ in range(self.mesh.vertex_count) ]
+            for t, (i1, i2, i3) in enumerate(self.mesh.triangles()):
+                using[i1].append(t)
+                using[i2].append(t)
+                using[i3].append(t)
+            self._vertex_triangles = using
+        using = self._vertex_triangles
+        found = set()
+        for i in vertices:
+            found.update(using[i])
+        return found
+
+    def tile_triangles(self, key:tuple[int]) -> list[tuple]:
+        """ the triangles touching a tile, in mesh (submission) order """
+        parts = self.parts
+        return [ triangle for t in sorted(self.tiles.get(key, ())) for triangle in parts[t] ]
+
+    def rect(self, key:tuple[int]) -> tuple[int]:
+        return tile_rect(key, self.framebuffer.width, self.framebuffer.height, self.tile_size)
@@ -0,0 +1,37 @@
+from .vmath import Vec3, Mat4
+
+
+""" as_mat4
+    :params: a Mat4 or a 3x4 or 4x4 affine transform, nested rows ([[r00,
+             r01, r02, t0], ...]) or flat row major (12 or 16 numbers),
+             lists, tuples or numpy arrays
+    :returns: a Mat4
+"""
+def as_mat4(transform) -> Mat4:
+    if isinstance(transform, Mat4):
+        return transform
+    if len(transform) in (12, 16):
+        return Mat4([ float(v) for v in transform[:12] ] + [ 0.0, 0.0, 0.0, 1.0 ])
+    if len(transform) in (3, 4) and all(len(row) == 4 for row in transform[:3]):
+        return Mat4.from_rows(transform)
+    raise ValueError("expected a 3x4 or 4x4 affine transform")
+
+""" transform_positions
+    :params: the transform, flat x, y, z positions, the vertex indices to
+             transform
+    :returns: list of transformed Vec3, one per index
+"""
+def transform_positions(matrix:Mat4, positions, indices:list[int]) -> list[Vec3]:
+    m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11 = matrix.m[:12]
+    result = []
+    for i in indices:
+        j = 3 * i
+        x = positions[j]
+        y = positions[j + 1]
+        z = positions[j + 2]
+        result.append(Vec3(
+                m0 * x + m1 * y + m2 * z + m3,
+                m4 * x + m5 * y + m6 * z + m7,
+                m8 * x + m9 * y + m10 * z + m11
+            ))
+    return result
@@ -0,0 +1,312 @@
+import os
+import sys
+import mmap
+import struct
+from array import array
+
+from .vmath import Vec2, Vec3
+from .mesh import Mesh
+
+
+CACHE_SUFFIX = ".rmesh"
+
+_MAGIC = b"RMESH\x00\x01\x00"
+# magic, byte order, source size, source mtime, vertices, indices, attributes
+_CACHE_HEADER = struct.Struct("<8scQqQQI")
+_KINDS = [ float, int, Vec2, Vec3 ]
+_SIZES = { float: 1, int: 1, Vec2: 2, Vec3: 3 }
+
+
+""" load_mesh
+    :params: path of a Wavefront OBJ or binary PLY file, whether to use the
+             binary cache file next to it (path + CACHE_SUFFIX)
+    :returns: a Mesh
+"""
+# The first load parses the file and writes the cache. Later loads map the
+# cache and the Mesh buffers are memoryviews into it, so nothing is parsed
+# or copied until the renderer reads a vertex.
+def load_mesh(path:str, cache:bool=True) -> Mesh:
+    cache_path = path + CACHE_SUFFIX
+    stat = os.stat(path)
+    if cache:
+        mesh = _read_cache(cache_path, stat)
+        if mesh != None:
+            return mesh
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".obj":
+        mesh = load_obj(path)
+    elif ext == ".ply":
+        mesh = load_ply(path)
+    else:
+        raise ValueError(f"unknown mesh format: {path}")
+
+    if cache:
+        try:
+            _write_cache(cache_path, stat, mesh)
+        except OSError:
+            pass  # e.g. read only directory, the mesh is still fine
+    return mesh
+
+""" load_obj
+    :params: path of a Wavefront OBJ file
+    :returns: a Mesh with "normal" (Vec3) and "uv" (Vec2) attributes when
+              the faces reference them, polygons are split into triangles
+"""
+def load_obj(path:str) -> Mesh:
+    positions = array("f")
+    normals = array("f")
+    uvs = array("f")
+    faces = []  # (v, vt, vn) index triples, zero based, -1 when missing
+
+    with open(path, "r") as file:
+        for line in file:
+            parts = line.split()
+            if not parts:
+                continue
+            tag = parts[0]
+            if tag == "v":
+                positions.extend(map(float, parts[1:4]))
+            elif tag == "vn":
+                normals.extend(map(float, parts[1:4]))
+            elif tag == "vt":
+                uvs.extend(map(float, parts[1:3]))
+            elif tag == "f":
+                counts = (len(positions) // 3, len(uvs) // 2, len(normals) // 3)
+                corners = [ _obj_corner(part, counts) for part in parts[1:] ]
+                for i in range(1, len(corners) - 1):
+                    faces.append((corners[0], corners[i], corners[i + 1]))
+
+    has_uv = any(c[1] >= 0 for face in faces for c in face)
+    has_normal = any(c[2] >= 0 for face in faces for c in face)
+    indices = array("I")
+    if not has_uv and not has_normal:
+        for face in faces:
+            indices.extend(c[0] for c in face)
+        return Mesh(positions, indices)
+
+    # one vertex per distinct (v, vt, vn) combination
+    out_positions = array("f")
+    out_normals = array("f")
+    out_uvs = array("f")
+    vertex_ids = {}
+    for face in faces:
+        for corner in face:
+            n = vertex_ids.get(corner)
+            if n == None:
+                n = len(vertex_ids)
+                vertex_ids[corner] = n
+                v, vt, vn = corner
+                out_positions.extend(positions[3 * v:3 * v + 3])
+                if has_normal:
+                    out_normals.extend(normals[3 * vn:3 * vn + 3] if vn >= 0 else (0.0, 0.0, 0.0))
+                if has_uv:
+                    out_uvs.extend(uvs[2 * vt:2 * vt + 2] if vt >= 0 else (0.0, 0.0))
+            indices.append(n)
+
+    attributes = {}
+    if has_normal:
+        attributes["normal"] = (Vec3, out_normals)
+    if has_uv:
+        attributes["uv"] = (Vec2, out_uvs)
+    return Mesh(out_positions, indices, attributes)
+
+def _obj_corner(part:str, counts:tuple[int]) -> tuple[int]:
+    corner = [ -1, -1, -1 ]
+    for n, value in enumerate(part.split("/")[:3]):
+        if value:
+            i = int(value)
+            # one based, negative counts back from the last element
+            corner[n] = i - 1 if i > 0 else counts[n] + i
+    return tuple(corner)
+
+_PLY_TYPES = {
+    "char": "b", "int8": "b", "uchar": "B", "uint8": "B",
+    "short": "h", "int16": "h", "ushort": "H", "uint16": "H",
+    "int": "i", "int32": "i", "uint": "I", "uint32": "I",
+    "float": "f", "float32": "f", "double": "d", "float64": "d"
+}
+
+""" load_ply
+    :params: path of a binary (little or big endian) PLY file
+    :returns: a Mesh with "normal" (nx, ny, nz), "color" (red, green, blue,
+              0 to 1) and "uv" (s, t or u, v) attributes when present,
+              polygons are split into triangles
+"""
+def load_ply(path:str) -> Mesh:
+    with open(path, "rb") as file:
+        data = file.read()
+
+    end = data.find(b"end_header")
+    if not data.startswith(b"ply") or end < 0:
+        raise ValueError(f"not a PLY file: {path}")
+    body = data.index(b"\n", end) + 1
+    elements = []  # [name, count, [(name, type, list count type)]]
+    order = None
+    for line in data[:body].decode("ascii").splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0] == "format":
+            if parts[1] == "binary_little_endian":
+                order = "<"
+            elif parts[1] == "binary_big_endian":
+                order = ">"
+            else:
+                raise ValueError(f"unsupported PLY format: {parts[1]}")
+        elif parts[0] == "element":
+            elements.append([ parts[1], int(parts[2]), [] ])
+        elif parts[0] == "property":
+            if parts[1] == "list":
+                elements[-1][2].append((parts[4], _PLY_TYPES[parts[3]], _PLY_TYPES[parts[2]]))
+            else:
+                elements[-1][2].append((parts[2], _PLY_TYPES[parts[1]], None))
+    if order == None:
+        raise ValueError(f"missing PLY format: {path}")
+
+    view = memoryview(data)
+    offset = body
+    positions = array("f")
+    attributes = {}
+    indices = array("I")
+    for name, count, properties in elements:
+        if name == "vertex":
+            offset = _ply_vertices(view, offset, order, count, properties, positions, attributes)
+        elif name == "face":
+            offset = _ply_faces(view, offset, order, count, properties, indices)
+        elif all(p[2] == None for p in properties):
+            offset += count * struct.calcsize(order + "".join(p[1] for p in properties))
+        else:
+            # lists of unknown elements can't be skipped without reading them
+            break
+    return Mesh(positions, indices, attributes)
+
+def _ply_vertices(view:memoryview, offset:int, order:str, count:int,
+                  properties:list, positions:array, attributes:dict) -> int:
+    if any(p[2] != None for p in properties):
+        raise ValueError("list properties in PLY vertices are not supported")
+    record = struct.Struct(order + "".join(p[1] for p in properties))
+    names = [ p[0] for p in properties ]
+    end = offset + count * record.size
+    columns = list(zip(*record.iter_unpack(view[offset:end]))) if count else [ () ] * len(names)
+    column = dict(zip(names, columns))
+
+    def interleave(keys:tuple[str], scale:float=1.0) -> array:
+        values = array("f")
+        for item in zip(*(column[k] for k in keys)):
+            values.extend(item)
+        if scale != 1.0:
+            values = array("f", (v * scale for v in values))
+        return values
+
+    positions.extend(interleave(("x", "y", "z")))
+    if all(k in column for k in ("nx", "ny", "nz")):
+        attributes["normal"] = (Vec3, interleave(("nx", "ny", "nz")))
+    if all(k in column for k in ("red", "green", "blue")):
+        is_byte = properties[names.index("red")][1] in "bB"
+        attributes["color"] = (Vec3, interleave(("red", "green", "blue"), 1 / 255 if is_byte else 1.0))
+    for u, v in (("s", "t"), ("u", "v"), ("texture_u", "texture_v")):
+        if u in column and v in column:
+            attributes["uv"] = (Vec2, interleave((u, v)))
+            break
+    return end
+
+def _ply_faces(view:memoryview, offset:int, order:str, count:int,
+               properties:list, indices:array) -> int:
+    if len(properties) != 1 or properties[0][2] == None:
+        raise ValueError("PLY faces must have exactly one list property")
+    _, index_type, count_type = properties[0]
+    count_size = struct.calcsize(order + count_type)
+    index_size = struct.calcsize(order + index_type)
+
+    # fast path: all faces are triangles, fixed size records
+    triangle = struct.Struct(order + count_type + 3 * index_type)
+    end = offset + count * triangle.size
+    if end <= len(view):
+        records = list(triangle.iter_unpack(view[offset:end])) if count else []
+        if all(r[0] == 3 for r in records):
+            for r in records:
+                indices.extend(r[1:])
+            return end
+
+    for _ in range(count):
+        n = struct.unpack_from(order + count_type, view, offset)[0]
+        offset += count_size
+        corners = struct.unpack_from(order + str(n) + index_type, view, offset)
+        offset += n * index_size
+        for i in range(1, n - 1):
+            indices.extend((corners[0], corners[i], corners[i + 1]))
+    return offset
+
+def _write_cache(cache_path:str, stat:os.stat_result, mesh:Mesh) -> None:
+    kinds = [ (name, kind, values) for name, (kind, values) in mesh.attributes.items() ]
+    header = bytearray(_CACHE_HEADER.pack(
+            _MAGIC, sys.byteorder[0].encode(), stat.st_size, stat.st_mtime_ns,
+            mesh.vertex_count, len(mesh.indices), len(kinds)
+        ))
+    for name, kind, _ in kinds:
+        encoded = name.encode("utf-8")
+        header += struct.pack("<HB", len(encoded), _KINDS.index(kind)) + encoded
+    header += bytes(-len(header) % 4)
+
+    # written next to the final file and renamed, so a cache is never seen
+    # half written
+    temp_path = cache_path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(header)
+        file.write(_as_bytes(mesh.positions, "f"))
+        for name, kind, values in kinds:
+            file.write(_as_bytes(values, "i" if kind is int else "f"))
+        file.write(_as_bytes(mesh.indices, "I"))
+    os.replace(temp_path, cache_path)
+
+def _as_bytes(values, typecode:str) -> bytes:
+    if isinstance(values, array) and values.typecode == typecode:
+        return values.tobytes()
+    return array(typecode, values).tobytes()
+
+def _read_cache(cache_path:str, stat:os.stat_result) -> Mesh | None:
+    try:
+        file = open(cache_path, "rb")
+    except OSError:
+        return None
+    with file:
+        head = file.read(_CACHE_HEADER.size)
+        if len(head) < _CACHE_HEADER.size:
+            return None
+        magic, byteorder, size, mtime, vertex_count, index_count, attribute_count =\
+            _CACHE_HEADER.unpack(head)
+        if (magic != _MAGIC or byteorder != sys.byteorder[0].encode() or
+            size != stat.st_size or mtime != stat.st_mtime_ns):
+            return None
+        kinds = []
+        for _ in range(attribute_count):
+            entry = file.read(3)
+            if len(entry) < 3:
+                return None
+            length, kind = struct.unpack("<HB", entry)
+            name = file.read(length)
+            if len(name) < length or kind >= len(_KINDS):
+                return None
+            kinds.append((name.decode("utf-8", "replace"), _KINDS[kind]))
+        offset = file.tell()
+        offset += -offset % 4
+        # a truncated (or otherwise damaged) cache is parsed again
+        values = 3 * vertex_count + sum(_SIZES[kind] * vertex_count for _, kind in kinds) + index_count
+        if offset + 4 * values != os.fstat(file.fileno()).st_size:
+            return None
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mapped)
+    def take(count:int, typecode:str) -> memoryview:
+        nonlocal offset
+        part = view[offset:offset + 4 * count].cast(typecode)
+        offset += 4 * count
+        return part
+
+    positions = take(3 * vertex_count, "f")
+    attributes = {}
+    for name, kind in kinds:
+        attributes[name] = (kind, take(_SIZES[kind] * vertex_count, "i" if kind is int else "f"))
+    indices = take(index_count, "I")
+    return Mesh(positions, indices, attributes)
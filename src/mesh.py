@@ -0,0 +1,128 @@
+from array import array
+
+from .vmath import Vec2, Vec3
+
+
+_SIZES = { float: 1, int: 1, Vec2: 2, Vec3: 3 }
+
+
+class Mesh:
+    """ Structure of arrays mesh:
+        positions: flat x, y, z per vertex
+        attributes: name -> (kind, flat values), kind is float, int, Vec2
+                    or Vec3, in the order the vertex shader gets them, or
+                    object with a list of any values, one per vertex
+        indices: flat, three per triangle
+        The buffers can be array('f')/array('I'), memoryviews (e.g. of a
+        mapped file) or numpy arrays, anything indexable with len().
+    """
+    def __init__(self, positions, indices, attributes:dict[str, tuple]=None) -> None:
+        self.positions = positions
+        self.indices = indices
+        self.attributes = attributes if attributes != None else {}
+        self._columns = [ (kind, values) for kind, values in self.attributes.values() ]
+
+    @classmethod
+    def from_lists(cls, vertices:list[list], indices:list[tuple[int]],
+                   typecode:str="f", int_typecode:str="i"):
+        """ vertices: [ [Vec3 position, attributes...], ... ], same layout
+                      for all vertices
+            indices: [ (i1, i2, i3), ... ]
+            typecode: array type of positions and float, Vec2 and Vec3
+                      attributes, int_typecode of int attributes
+            Attributes that aren't float, int, Vec2 or Vec3 in every vertex
+            (e.g. a tuple color) are kept as they are, kind object.
+        """
+        positions = array(typecode)
+        for vertex in vertices:
+            pos = vertex[0]
+            positions.extend((pos.x, pos.y, pos.z))
+
+        attributes = {}
+        if vertices:
+            for n in range(1, len(vertices[0])):
+                column = [ vertex[n] for vertex in vertices ]
+                attributes[f"attr{n}"] = _flatten(column, typecode, int_typecode)
+
+        flat = array("I")
+        for t in indices:
+            flat.extend(t)
+        return cls(positions, flat, attributes)
+
+    def assign(self, other) -> None:
+        """ takes the buffers of another mesh, keeping this object (and what
+            refers to it, e.g. a BVH). Equal indices are kept, so what is
+            cached for them stays valid.
+        """
+        self.positions = other.positions
+        if type(other.indices) != type(self.indices) or other.indices != self.indices:
+            self.indices = other.indices
+        self.attributes = other.attributes
+        self._columns = other._columns
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.positions) // 3
+
+    @property
+    def triangle_count(self) -> int:
+        return len(self.indices) // 3
+
+    def position(self, i:int) -> Vec3:
+        p = self.positions
+        i *= 3
+        return Vec3(float(p[i]), float(p[i + 1]), float(p[i + 2]))
+
+    def vertex_attributes(self, i:int) -> list:
+        result = []
+        for kind, values in self._columns:
+            if kind is Vec3:
+                j = 3 * i
+                result.append(Vec3(float(values[j]), float(values[j + 1]), float(values[j + 2])))
+            elif kind is Vec2:
+                j = 2 * i
+                result.append(Vec2(float(values[j]), float(values[j + 1])))
+            elif kind is object:
+                result.append(values[i])
+            else:
+                result.append(kind(values[i]))
+        return result
+
+    def vertex(self, i:int) -> list:
+        """ the vertex as [Vec3 position, attributes...] like the list format """
+        return [ self.position(i) ] + self.vertex_attributes(i)
+
+    def triangle(self, t:int) -> tuple[int]:
+        i = 3 * t
+        idx = self.indices
+        return (int(idx[i]), int(idx[i + 1]), int(idx[i + 2]))
+
+    def triangles(self):
+        """ iterates the triangles as (i1, i2, i3) without a list of tuples """
+        it = iter(self.indices)
+        return zip(it, it, it)
+
+    def positions_array(self):
+        """ numpy (N, 3) view of the positions, no copy for arrays and buffers """
+        import numpy as np
+        return np.asarray(self.positions).reshape(-1, 3)
+
+# (kind, values) of an attribute column, exact types only, so e.g. bool or
+# a float subclass are kept as objects like any other type
+def _flatten(column:list, typecode:str, int_typecode:str) -> tuple:
+    kind = type(column[0])
+    if kind not in _SIZES or any(type(e) is not kind for e in column):
+        return (object, column)
+    values = array(int_typecode if kind is int else typecode)
+    if kind is Vec3:
+        for e in column:
+            values.extend((e.x, e.y, e.z))
+    elif kind is Vec2:
+        for e in column:
+            values.extend((e.x, e.y))
+    else:
+        try:
+            values.extend(column)
+        except OverflowError:
+            return (object, column)
+    return (kind, values)
@@ -0,0 +1,130 @@
+import os
+import sys
+from time import perf_counter
+
+from .framebuffer import Framebuffer
+from .sinks import FrameSink
+
+
+class Preview(FrameSink):
+    """ A tkinter window showing the framebuffer while it is rendered.
+        Give update to the renderer as on_tile: drawn tiles are collected
+        into a dirty rectangle, which is copied to the window at most every
+        interval seconds, so the preview costs little next to rendering.
+        As a FrameSink (render_sequence) it shows every written frame.
+        Without a display or tkinter (or with headless=True) every method
+        does nothing, so scripts can leave the preview on.
+    """
+    def __init__(self, width:int, height:int, title:str="Renderer-py",
+                 interval:float=0.1, headless:bool=None) -> None:
+        self.width = width
+        self.height = height
+        self.interval = interval
+        self.root = None
+        self.image = None
+        self._dirty = None  # (x0, y0, x1, y1) not shown yet, y up
+        self._shown = float("-inf")
+        if headless == None:
+            headless = not _has_display()
+        if headless:
+            return
+
+        try:
+            import tkinter
+            root = tkinter.Tk()
+        except Exception:  # ImportError, or TclError without a display
+            return
+        root.title(title)
+        root.resizable(False, False)
+        root.protocol("WM_DELETE_WINDOW", self.close)
+        self.root = root
+        self.image = tkinter.PhotoImage(master=root, width=width, height=height)
+        tkinter.Label(root, image=self.image, borderwidth=0).pack()
+        root.update()
+
+    @property
+    def headless(self) -> bool:
+        return self.root == None
+
+    """ update
+        :params: the framebuffer, the drawn rect (x0, y0, x1, y1) or None
+                 for all of it
+    """
+    def update(self, framebuffer:Framebuffer, rect:tuple[int]=None) -> None:
+        if self.root == None:
+            return
+        if rect == None:
+            rect = (0, 0, framebuffer.width, framebuffer.height)
+        dirty = self._dirty
+        if dirty == None:
+            self._dirty = rect
+        else:
+            self._dirty = (
+                min(dirty[0], rect[0]), min(dirty[1], rect[1]),
+                max(dirty[2], rect[2]), max(dirty[3], rect[3])
+            )
+        if perf_counter() - self._shown >= self.interval:
+            self.flush(framebuffer)
+
+    def flush(self, framebuffer:Framebuffer) -> None:
+        """ copies the dirty rectangle to the window now """
+        if self.root == None:
+            return
+        if self._dirty != None:
+            x0, y0, x1, y1 = self._dirty
+            self._dirty = None
+            x1 = min(x1, framebuffer.width, self.width)
+            y1 = min(y1, framebuffer.height, self.height)
+            if x0 < x1 and y0 < y1:
+                self._put(framebuffer, x0, y0, x1, y1)
+        self._shown = perf_counter()
+        self.root.update()
+
+    # the rectangle as a binary PPM image (top row first, RGB) copied into
+    # the window's image, Tk has no faster way of taking raw pixels
+    def _put(self, framebuffer:Framebuffer, x0:int, y0:int, x1:int, y1:int) -> None:
+        import tkinter
+        width = x1 - x0
+        row_size = 3 * width
+        stride = 3 * framebuffer.width
+        color = memoryview(framebuffer.color).cast("B")
+        bgr = bytearray(row_size * (y1 - y0))
+        target = 0
+        for y in range(y1 - 1, y0 - 1, -1):
+            start = y * stride + 3 * x0
+            bgr[target:target + row_size] = color[start:start + row_size]
+            target += row_size
+        rgb = bytearray(len(bgr))
+        rgb[0::3] = bgr[2::3]
+        rgb[1::3] = bgr[1::3]
+        rgb[2::3] = bgr[0::3]
+
+        patch = tkinter.PhotoImage(master=self.root, format="PPM",
+                                   data=b"P6\n%d %d\n255\n" % (width, y1 - y0) + rgb)
+        self.image.tk.call(self.image, "copy", patch, "-to", x0, self.height - y1)
+
+    def write(self, framebuffer:Framebuffer) -> None:
+        self.update(framebuffer)
+        self.flush(framebuffer)
+
+    def show(self, framebuffer:Framebuffer=None) -> None:
+        """ shows what is left and waits until the window is closed """
+        if self.root == None:
+            return
+        if framebuffer != None:
+            self.write(framebuffer)
+        if self.root != None:
+            self.root.mainloop()
+
+    def close(self) -> None:
+        if self.root == None:
+            return
+        root = self.root
+        self.root = None
+        self.image = None
+        root.destroy()
+
+def _has_display() -> bool:
+    if sys.platform in ("win32", "darwin"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
@@ -0,0 +1,221 @@
+from .vmath import Vec3
+from .framebuffer import Framebuffer
+from .varyings import VaryingPlan
+
+
+NO_PIXELS = (0, 0, 0)  # pixel counts of a triangle that draws nothing
+
+
+""" edge_setup
+    :params: integer screen positions of the triangle corners
+    :returns: (area, edges, order) or None for degenerate triangles
+"""
+# Each edge is (dx, dy, bias) for the edge function of the corner opposite
+# to it, `order` maps the edges back to the input corners. Corners are
+# reordered so the area is positive (counter clockwise with y pointing up).
+# The bias implements the top-left fill rule: a pixel exactly on an edge is
+# only inside if it is a top or a left edge, so pixels on shared edges are
+# drawn exactly once.
+def edge_setup(p1:Vec3, p2:Vec3, p3:Vec3) -> tuple | None:
+    order = (0, 1, 2)
+    area = (p2.x - p1.x) * (p3.y - p1.y) - (p2.y - p1.y) * (p3.x - p1.x)
+    if area == 0:
+        return None
+    if area < 0:
+        p2, p3 = p3, p2
+        order = (0, 2, 1)
+        area = -area
+
+    edges = []
+    for a, b in ((p2, p3), (p3, p1), (p1, p2)):
+        dx = b.x - a.x
+        dy = b.y - a.y
+        is_top_left = dy < 0 or (dy == 0 and dx < 0)
+        edges.append((dx, dy, 0 if is_top_left else -1))
+
+    return (area, edges, order)
+
+def edge_at(a:Vec3, edge:tuple, x:int, y:int) -> int:
+    dx, dy, bias = edge
+    return dx * (y - a.y) - dy * (x - a.x) + bias
+
+""" varying_derivatives
+    :params: flattened varyings as (v1, v2, v3) per component (vertices in
+             edge_setup order), the edges and area from edge_setup
+    :returns: (d/dx, d/dy) lists, one value per component
+"""
+# barycentric weights step by -dy / area along x and dx / area along y
+def varying_derivatives(columns:list[tuple], edges:tuple, area:int) -> tuple[list[float], list[float]]:
+    (dx1, dy1, _), (dx2, dy2, _), (dx3, dy3, _) = edges
+    inv_area = 1 / area
+    return (
+        [ -(c1 * dy1 + c2 * dy2 + c3 * dy3) * inv_area for c1, c2, c3 in columns ],
+        [ (c1 * dx1 + c2 * dx2 + c3 * dx3) * inv_area for c1, c2, c3 in columns ]
+    )
+
+""" draw_triangle
+    :params: integer screen positions, per vertex buffers from the vertex
+             shader, the framebuffer, the clip rectangle (x0, y0, x1, y1)
+             with exclusive maximum, the fragment shader and optionally the
+             VaryingPlan of the draw
+    :returns: pixel counts (tested, covered, shaded), tested are the pixels
+              the edge functions were evaluated for, covered the ones
+              inside and shaded the ones that passed the depth test
+"""
+# The fragment buffer and its Vec2/Vec3 entries are reused for every pixel,
+# fragment shaders must not keep references to them.
+def draw_triangle(p1:Vec3, p2:Vec3, p3:Vec3,
+                  b1:list, b2:list, b3:list,
+                  framebuffer:Framebuffer, rect:tuple[int],
+                  fragment_shader, plan:VaryingPlan=None) -> tuple[int]:
+    setup = edge_setup(p1, p2, p3)
+    if setup == None:
+        return NO_PIXELS
+    area, edges, order = setup
+    points = (p1, p2, p3)
+    buffers = (b1, b2, b3)
+    p1, p2, p3 = [points[i] for i in order]
+    b1, b2, b3 = [buffers[i] for i in order]
+
+    x_min = max(min(p1.x, p2.x, p3.x), rect[0])
+    y_min = max(min(p1.y, p2.y, p3.y), rect[1])
+    x_max = min(max(p1.x, p2.x, p3.x), rect[2] - 1)
+    y_max = min(max(p1.y, p2.y, p3.y), rect[3] - 1)
+    if x_min > x_max or y_min > y_max:
+        return NO_PIXELS
+
+    # edge function values at (x_min, y_min), stepped by -dy along a
+    # scanline and by dx from one scanline to the next
+    r1 = edge_at(p2, edges[0], x_min, y_min)
+    r2 = edge_at(p3, edges[1], x_min, y_min)
+    r3 = edge_at(p1, edges[2], x_min, y_min)
+    (dx1, dy1, k1), (dx2, dy2, k2), (dx3, dy3, k3) = edges
+
+    width = framebuffer.width
+    depth_buffer = framebuffer.depth
+    color_buffer = framebuffer.color
+    z1, z2, z3 = p1.z, p2.z, p3.z
+    inv_area = 1 / area
+
+    if plan == None or not plan.matches(b1):
+        plan = VaryingPlan(b1)
+    columns = list(zip(plan.flatten(b1), plan.flatten(b2), plan.flatten(b3)))
+    fill = plan.fill
+    buffer = plan.new_buffer()
+    position = buffer[0]
+    buffer.ddx, buffer.ddy = varying_derivatives(columns, edges, area)
+    tested = rejected = shaded = 0
+
+    for y in range(y_min, y_max + 1):
+        e1, e2, e3 = r1, r2, r3
+        row = y * width
+        was_inside = False
+        for x in range(x_min, x_max + 1):
+            if (e1 | e2 | e3) >= 0:
+                was_inside = True
+                w1 = (e1 - k1) * inv_area
+                w2 = (e2 - k2) * inv_area
+                w3 = (e3 - k3) * inv_area
+
+                depth = w1 * z1 + w2 * z2 + w3 * z3
+
+                if depth <= depth_buffer[row + x]:
+                    position.x = x
+                    position.y = y
+                    position.z = depth
+                    fill(buffer, [ w1 * c1 + w2 * c2 + w3 * c3 for c1, c2, c3 in columns ])
+
+                    r, g, b = fragment_shader(buffer)
+
+                    r = _clamp(r, 0, 255)
+                    g = _clamp(g, 0, 255)
+                    b = _clamp(b, 0, 255)
+
+                    depth_buffer[row + x] = depth
+                    i = 3 * (row + x)
+                    color_buffer[i] = b
+                    color_buffer[i + 1] = g
+                    color_buffer[i + 2] = r
+                    shaded += 1
+                else:
+                    rejected += 1
+            elif was_inside:
+                # triangles are convex, nothing left on this scanline
+                break
+            e1 -= dy1
+            e2 -= dy2
+            e3 -= dy3
+        tested += x - x_min + 1
+        r1 += dx1
+        r2 += dx2
+        r3 += dx3
+    return (tested, shaded + rejected, shaded)
+
+""" draw_depth
+    :params: integer screen positions, the framebuffer, the clip rectangle
+             (x0, y0, x1, y1) with exclusive maximum
+    :returns: pixel counts (tested, covered, written) like draw_triangle
+"""
+# draw_triangle without varyings, fragment shader and color: only the
+# depth test and depth writes (a depth only pass).
+def draw_depth(p1:Vec3, p2:Vec3, p3:Vec3, framebuffer:Framebuffer,
+               rect:tuple[int]) -> tuple[int]:
+    setup = edge_setup(p1, p2, p3)
+    if setup == None:
+        return NO_PIXELS
+    area, edges, order = setup
+    points = (p1, p2, p3)
+    p1, p2, p3 = [points[i] for i in order]
+
+    x_min = max(min(p1.x, p2.x, p3.x), rect[0])
+    y_min = max(min(p1.y, p2.y, p3.y), rect[1])
+    x_max = min(max(p1.x, p2.x, p3.x), rect[2] - 1)
+    y_max = min(max(p1.y, p2.y, p3.y), rect[3] - 1)
+    if x_min > x_max or y_min > y_max:
+        return NO_PIXELS
+
+    r1 = edge_at(p2, edges[0], x_min, y_min)
+    r2 = edge_at(p3, edges[1], x_min, y_min)
+    r3 = edge_at(p1, edges[2], x_min, y_min)
+    (dx1, dy1, k1), (dx2, dy2, k2), (dx3, dy3, k3) = edges
+
+    width = framebuffer.width
+    depth_buffer = framebuffer.depth
+    z1, z2, z3 = p1.z, p2.z, p3.z
+    inv_area = 1 / area
+    tested = rejected = written = 0
+
+    for y in range(y_min, y_max + 1):
+        e1, e2, e3 = r1, r2, r3
+        row = y * width
+        was_inside = False
+        for x in range(x_min, x_max + 1):
+            if (e1 | e2 | e3) >= 0:
+                was_inside = True
+                depth = (
+                    (e1 - k1) * inv_area * z1 +
+                    (e2 - k2) * inv_area * z2 +
+                    (e3 - k3) * inv_area * z3
+                )
+                if depth <= depth_buffer[row + x]:
+                    depth_buffer[row + x] = depth
+                    written += 1
+                else:
+                    rejected += 1
+            elif was_inside:
+                break
+            e1 -= dy1
+            e2 -= dy2
+            e3 -= dy3
+        tested += x - x_min + 1
+        r1 += dx1
+        r2 += dx2
+        r3 += dx3
+    return (tested, written + rejected, written)
+
+def _clamp(v:float|int, a:float|int, b:float|int) -> float|int:
+    if v < a:
+        return a
+    if v > b:
+        return b
+    return v
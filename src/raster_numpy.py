@@ -0,0 +1,198 @@
+import numpy as np
+
+from .vmath import Vec2, Vec3
+from .raster import NO_PIXELS, edge_setup, varying_derivatives, _clamp
+from .framebuffer import Framebuffer
+from .varyings import VaryingPlan, FragmentBuffer
+
+
+""" draw_triangle
+    :params: integer screen positions, per vertex buffers from the vertex
+             shader, the framebuffer, the clip rectangle (x0, y0, x1, y1)
+             with exclusive maximum, the batched fragment shader and
+             optionally the VaryingPlan of the draw
+    :returns: pixel counts (tested, covered, shaded) like
+              raster.draw_triangle, tested is the whole bounding box
+"""
+# Same edge functions, fill rule and arithmetic as raster.draw_triangle,
+# evaluated for the whole bounding box at once, so both backends produce
+# identical pixels.
+def draw_triangle(p1:Vec3, p2:Vec3, p3:Vec3,
+                  b1:list, b2:list, b3:list,
+                  framebuffer:Framebuffer, rect:tuple[int],
+                  fragment_shader, plan:VaryingPlan=None) -> tuple[int]:
+    setup = edge_setup(p1, p2, p3)
+    if setup == None:
+        return NO_PIXELS
+    area, edges, order = setup
+    points = (p1, p2, p3)
+    buffers = (b1, b2, b3)
+    p1, p2, p3 = [points[i] for i in order]
+    b1, b2, b3 = [buffers[i] for i in order]
+
+    x_min = max(min(p1.x, p2.x, p3.x), rect[0])
+    y_min = max(min(p1.y, p2.y, p3.y), rect[1])
+    x_max = min(max(p1.x, p2.x, p3.x), rect[2] - 1)
+    y_max = min(max(p1.y, p2.y, p3.y), rect[3] - 1)
+    if x_min > x_max or y_min > y_max:
+        return NO_PIXELS
+
+    xs = np.arange(x_min, x_max + 1, dtype=np.int64)[None, :]
+    ys = np.arange(y_min, y_max + 1, dtype=np.int64)[:, None]
+    (dx1, dy1, k1), (dx2, dy2, k2), (dx3, dy3, k3) = edges
+    e1 = dx1 * (ys - p2.y) - dy1 * (xs - p2.x) + k1
+    e2 = dx2 * (ys - p3.y) - dy2 * (xs - p3.x) + k2
+    e3 = dx3 * (ys - p1.y) - dy3 * (xs - p1.x) + k3
+
+    inside = (e1 | e2 | e3) >= 0
+    tested = inside.size
+    if not inside.any():
+        return (tested, 0, 0)
+    yi, xi = np.nonzero(inside)
+
+    inv_area = 1 / area
+    w1 = (e1[inside] - k1) * inv_area
+    w2 = (e2[inside] - k2) * inv_area
+    w3 = (e3[inside] - k3) * inv_area
+    z = w1 * p1.z + w2 * p2.z + w3 * p3.z
+
+    tile = framebuffer.depth_array()[y_min:y_max + 1, x_min:x_max + 1]
+    passed = z <= tile[yi, xi]
+    covered = len(z)
+    if not passed.any():
+        return (tested, covered, 0)
+    yi = yi[passed]
+    xi = xi[passed]
+    z = z[passed]
+
+    w1 = w1[passed]
+    w2 = w2[passed]
+    w3 = w3[passed]
+    position = np.stack((xi + x_min, yi + y_min), axis=1)
+    if plan == None or not plan.matches(b1):
+        plan = VaryingPlan(b1)
+    varyings = interpolate_varyings(plan, b1, b2, b3, w1, w2, w3)
+    if getattr(fragment_shader, "uses_derivatives", False):
+        columns = list(zip(plan.flatten(b1), plan.flatten(b2), plan.flatten(b3)))
+        colors = fragment_shader(position, z, varyings,
+                                 derivatives=varying_derivatives(columns, edges, area))
+    else:
+        colors = fragment_shader(position, z, varyings)
+
+    tile[yi, xi] = z
+    # RGB from the shader, BGR in the framebuffer
+    framebuffer.color_array()[y_min:y_max + 1, x_min:x_max + 1][yi, xi] = colors[:, ::-1]
+    return (tested, covered, len(z))
+
+""" draw_depth
+    :params: integer screen positions, the framebuffer, the clip rectangle
+             (x0, y0, x1, y1) with exclusive maximum
+    :returns: pixel counts (tested, covered, written) like draw_triangle
+"""
+# draw_triangle without varyings, fragment shader and color, same depths
+# as raster.draw_depth.
+def draw_depth(p1:Vec3, p2:Vec3, p3:Vec3, framebuffer:Framebuffer,
+               rect:tuple[int]) -> tuple[int]:
+    setup = edge_setup(p1, p2, p3)
+    if setup == None:
+        return NO_PIXELS
+    area, edges, order = setup
+    points = (p1, p2, p3)
+    p1, p2, p3 = [points[i] for i in order]
+
+    x_min = max(min(p1.x, p2.x, p3.x), rect[0])
+    y_min = max(min(p1.y, p2.y, p3.y), rect[1])
+    x_max = min(max(p1.x, p2.x, p3.x), rect[2] - 1)
+    y_max = min(max(p1.y, p2.y, p3.y), rect[3] - 1)
+    if x_min > x_max or y_min > y_max:
+        return NO_PIXELS
+
+    xs = np.arange(x_min, x_max + 1, dtype=np.int64)[None, :]
+    ys = np.arange(y_min, y_max + 1, dtype=np.int64)[:, None]
+    (dx1, dy1, k1), (dx2, dy2, k2), (dx3, dy3, k3) = edges
+    e1 = dx1 * (ys - p2.y) - dy1 * (xs - p2.x) + k1
+    e2 = dx2 * (ys - p3.y) - dy2 * (xs - p3.x) + k2
+    e3 = dx3 * (ys - p1.y) - dy3 * (xs - p1.x) + k3
+
+    inside = (e1 | e2 | e3) >= 0
+    tested = inside.size
+    if not inside.any():
+        return (tested, 0, 0)
+    yi, xi = np.nonzero(inside)
+
+    inv_area = 1 / area
+    z = ((e1[inside] - k1) * inv_area * p1.z +
+         (e2[inside] - k2) * inv_area * p2.z +
+         (e3[inside] - k3) * inv_area * p3.z)
+    tile = framebuffer.depth_array()[y_min:y_max + 1, x_min:x_max + 1]
+    passed = z <= tile[yi, xi]
+    tile[yi[passed], xi[passed]] = z[passed]
+    return (tested, len(z), int(passed.sum()))
+
+""" interpolate_varyings
+    :params: the VaryingPlan, per vertex buffers from the vertex shader,
+             barycentric weights
+    :returns: list of (N, k) arrays, one per float, int, Vec2 or Vec3 entry
+"""
+def interpolate_varyings(plan:VaryingPlan, b1:list, b2:list, b3:list,
+                         w1:np.ndarray, w2:np.ndarray, w3:np.ndarray) -> list[np.ndarray]:
+    v = np.array([ plan.flatten(b1), plan.flatten(b2), plan.flatten(b3) ], dtype=np.float64)
+    values = w1[:, None] * v[0] + w2[:, None] * v[1] + w3[:, None] * v[2]
+    varyings = []
+    for _, kind, o in plan.slots:
+        if kind is Vec3:
+            varying = values[:, o:o + 3]
+        elif kind is Vec2:
+            varying = values[:, o:o + 2]
+        else:
+            varying = values[:, o:o + 1]
+            if kind is int:
+                varying = varying.astype(np.int64)
+        varyings.append(varying)
+    return varyings
+
+""" per_pixel
+    :params: a per pixel fragment_shader(buffer) -> (r, g, b)
+    :returns: the same shader behind the batched contract
+"""
+# Like in raster.draw_triangle the fragment buffer and its vectors are
+# reused for every pixel, and it holds the varyings' derivatives.
+def per_pixel(fragment_shader):
+    def fragment_shader_batch(position:np.ndarray, depth:np.ndarray,
+                              varyings:list[np.ndarray], derivatives:tuple=None) -> np.ndarray:
+        columns = [ position[:, 0].tolist(), position[:, 1].tolist(), depth.tolist() ]
+        buffer = FragmentBuffer([ Vec3() ])
+        buffer.offsets = []
+        size = 0
+        for varying in varyings:
+            k = varying.shape[1]
+            buffer.offsets.append((size, k))
+            size += k
+            if k == 1:
+                columns.append(varying[:, 0].tolist())
+                buffer.append(None)
+            else:
+                columns.append(varying.tolist())
+                buffer.append(Vec2() if k == 2 else Vec3())
+        if derivatives != None:
+            buffer.ddx, buffer.ddy = derivatives
+        else:
+            buffer.ddx = [ 0.0 ] * size
+            buffer.ddy = [ 0.0 ] * size
+        vectors = [ (n, e) for n, e in enumerate(buffer) if n > 0 and e != None ]
+        scalars = [ n for n, e in enumerate(buffer) if e == None ]
+        point = buffer[0]
+
+        colors = []
+        for row in zip(*columns):
+            point.set(row[0], row[1], row[2])
+            for n, e in vectors:
+                e.set(*row[n + 2])
+            for n in scalars:
+                buffer[n] = row[n + 2]
+            r, g, b = fragment_shader(buffer)
+            colors.append((_clamp(r, 0, 255), _clamp(g, 0, 255), _clamp(b, 0, 255)))
+        return np.array(colors, dtype=np.uint8).reshape(-1, 3)
+
+    fragment_shader_batch.uses_derivatives = True
+    return fragment_shader_batch
@@ -1,25 +1,50 @@
-from copy import deepcopy
+from time import perf_counter
 
-from .vmath import Vec2, Vec3, Mat3
+from .vmath import Vec2, Vec3, Mat3, Mat4
 from .camera import PerspectiveCam, OrthographicCam, Camera
-from .bitmap import make_bitmap
-
-
-# global variables
-vertices:list[list]      = []  # first elemnt in nested list must be position
+from .sinks import FrameSink, BmpSink
+from .framebuffer import Framebuffer
+from .mesh import Mesh
+from .tiled import draw_tiled, _sum_counts
+from .hiz import draw_triangles, nearest_depth
+from .instancing import as_mat4, transform_positions
+from .bvh import BVH
+from .incremental import RetainedFrame
+from .stats import RenderStats
+from .varyings import VaryingPlan
+from .assembly import CULL_NONE, CULL_CW, CULL_CCW, clip_triangle, is_culled
+
+
+# global variables, the state of the default Renderer (see _sync)
+vertices:list[list]      = []  # first elemnt in nested list must be position (or a Mesh)
 indices:list[tuple[int]] = []  # each tuple must have three indices
 camera:Camera = None
 screen_width  = 400
 screen_height = 400
 back_fill:tuple[int] = (0x00, 0x00, 0x00)  # RGB (max 255)
-# pixel = (depth:float, red:int, green:int, blue:int)
-_screen:list[tuple[float | int]] = []  # list of pixels
-
+cull_mode = CULL_NONE  # CULL_CW or CULL_CCW drop triangles with that winding
+backend = "python"  # "python" (reference) or "numpy", see _get_backend
+framebuffer:Framebuffer = None
+workers = 1     # > 1 or None (one per core) renders tiles in worker processes
+tile_size = 64  # pixels, for workers != 1 or on_tile
+early_z = False  # draw front to back, skipping triangles behind drawn depth
+bvh:BVH = None   # built over the mesh, skips triangles outside of the view
+# post-transform vertex cache statistics of the last render()
+vertex_cache_hits   = 0
+vertex_cache_misses = 0
+# the instance render_instanced() is transforming, for vertex shaders
+instance_id = 0
+# render() returns a RenderStats when profile is True, the stage callbacks
+# are called as callback(stage name, renderer) around each stage
+profile = False
+before_stage:list = []
+after_stage:list  = []
+# called as on_tile(framebuffer, rect) whenever a tile of the screen is
+# drawn (e.g. Preview.update), rect is (x0, y0, x1, y1) with y up
+on_tile = None
+# render keeps per tile triangle lists for rerender
+incremental = False
 
-def get_triangle_area(p1:Vec2, p2:Vec2, p3:Vec2) -> float:
-    v1 = p1.copy().sub(p3)
-    v2 = p2.copy().sub(p3)
-    return Vec3(v1.x, v1.y, 0.0).cross(Vec3(v2.x, v2.y, 0.0)).get_scale() / 2
 
 def vec3_to_vec3i(vec:Vec3) -> Vec3:
     return Vec3(
@@ -28,64 +53,34 @@ def vec3_to_vec3i(vec:Vec3) -> Vec3:
             int(vec.z)
         )
 
-def lerp(v1:float, v2:float, t:float) -> float:
-    return (1 - t) * v1 + t * v2
-
-def tlerp(v1:float, v2:float, v3:float, t:float, s:float) -> float:
-    i = lerp(v1, v2, t)
-    return lerp(v3, i, s)
-
-def triangle_lerp(vt:Vec2, v1:Vec3, v2:Vec3, v3:Vec3) -> float | None:
-    va = Vec2(v2.x, v2.y).sub(Vec2(v1.x, v1.y))
-    vc = vt.copy().sub(Vec2(v3.x, v3.y))
-
-    b = vc.y * (v1.x - v3.x) - vc.x * (v1.y - v3.y)
-    a = vc.y * va.x - vc.x * va.y
-
-    if a == 0:
-        return None
-
-    t = - b / a
-
-    vi = Vec2(v1.x, v1.y).add(va.copy().scale(t))
-    i = lerp(v1.z, v2.z, t)
-
-    vn = vi.copy().sub(Vec2(v3.x, v3.y))
-
-    if vn.get_scale() == 0:
-        return None
-    
-    s = vc.get_scale() / vn.get_scale()
+# list input keeps the precision of Python floats and ints
+def _mesh_from_lists(vertices:list[list], indices:list[tuple[int]]) -> Mesh:
+    return Mesh.from_lists(vertices, indices, typecode="d", int_typecode="q")
 
-    return lerp(v3.z, i, s)
-
-def get_triangle_lerp(vt:Vec2, v1:Vec3, v2:Vec3, v3:Vec3) -> tuple[float] | None:
-    va = Vec2(v2.x, v2.y).sub(Vec2(v1.x, v1.y))
-    vc = vt.copy().sub(Vec2(v3.x, v3.y))
-
-    b = vc.y * (v1.x - v3.x) - vc.x * (v1.y - v3.y)
-    a = vc.y * va.x - vc.x * va.y
-
-    if a == 0:
-        return None
-
-    t = - b / a
-
-    vi = Vec2(v1.x, v1.y).add(va.copy().scale(t))
-
-    vn = vi.copy().sub(Vec2(v3.x, v3.y))
-
-    if vn.get_scale() == 0:
-        return None
-    
-    s = vc.get_scale() / vn.get_scale()
-
-    return (t, s)
-
-def init() -> None:
-    global _screen, back_fill, screen_width, screen_height
-    r, g, b = back_fill
-    _screen = [ (-1, r, g, b) ] * screen_width * screen_height
+""" _used_vertices
+    :params: triangles as tuples of three vertex indices
+    :returns: (vertex indices in order of first use, number of corners)
+"""
+def _used_vertices(triangle_indices) -> tuple[list[int], int]:
+    used = []
+    seen = set()
+    corners = 0
+    for t in triangle_indices:
+        corners += 3
+        for i in t:
+            if i not in seen:
+                seen.add(i)
+                used.append(i)
+    return (used, corners)
+
+def _get_backend(name:str):
+    if name == "python":
+        from . import raster
+        return raster
+    if name == "numpy":
+        from . import raster_numpy
+        return raster_numpy
+    raise ValueError(f"unknown backend: {name}")
 
 """ vertex_shader
     :params: vertex data with position
@@ -101,145 +96,510 @@ def vertex_shader(vertex:list) -> list:
 def fragment_shader(buffer:list) -> tuple[int]:
     return (0x00, 0x00, 0x00)
 
-def save_screen(file_path:str) -> None:
-    global _screen, screen_width, screen_height
-    pixel_data = []
-    for pixel in _screen:
-        _, r, g, b = pixel
-        pixel_data.extend([b, g, r])
-    make_bitmap(file_path, screen_width, screen_height, pixel_data)
-
-def _clamp(v:float|int, a:float|int, b:float|int) -> float|int:
-    if v < a:
-        return a
-    if v > b:
-        return b
-    return v
-
-def render() -> None:
-    global _screen, screen_width, screen_height, camera, vertices, indices
-    SCALAR = screen_width / camera.size.x
-    OFFSET = Vec3(screen_width / 2, screen_height / 2, 0.0)
-
-    for t in indices:
-        i1, i2, i3 = t
-        triangle = [
-            deepcopy(vertices[i1]),
-            deepcopy(vertices[i2]),
-            deepcopy(vertices[i3])
-        ]
-
-        is_visible = False
-        for vertex in triangle:
-            vertex[0] = camera.world_to_screen(vertex[0])
-            if not is_visible:
-                is_visible = camera.is_visible(vertex[0])
-
-        if not is_visible:
-            continue
-
-        buffers = []
-        for vertex in triangle:
-            vertex[0] = vertex[0].scale(SCALAR)\
-                                 .add(OFFSET)
-            vertex[0] = vec3_to_vec3i(vertex[0])
-
-            buffer = vertex_shader(vertex)
-            buffers.append(buffer)
-
-        pos = Vec2(
-            min(triangle[0][0].x, triangle[1][0].x, triangle[2][0].x),
-            min(triangle[0][0].y, triangle[1][0].y, triangle[2][0].y)
-        )
-        size = Vec2(
-            max(triangle[0][0].x, triangle[1][0].x, triangle[2][0].x),
-            max(triangle[0][0].y, triangle[1][0].y, triangle[2][0].y)
-        ).sub(pos)
-
-        if pos.x < 0:
-            pos.x = 0
-        if pos.y < 0:
-            pos.y = 0
-        if pos.x + size.x > screen_width:
-            size.x = screen_width - pos.x
-        if pos.y + size.y > screen_height:
-            size.y = screen_height - pos.y
-
-        for m in range(size.y):
-            for n in range(size.x):
-                x = pos.x + n
-                y = pos.y + m
-
-                v  = Vec2(x, y)
-                v1 = Vec2(triangle[0][0].x, triangle[0][0].y)
-                v2 = Vec2(triangle[1][0].x, triangle[1][0].y)
-                v3 = Vec2(triangle[2][0].x, triangle[2][0].y)
-
-                a  = get_triangle_area(v1, v2, v3)
-                a1 = get_triangle_area( v, v2, v3)
-                a2 = get_triangle_area(v1,  v, v3)
-                a3 = get_triangle_area(v1, v2, v)
-
-                tolerance = 1
-                d = a1 + a2 + a3 - a
-                is_inside = d <= tolerance and d >= -tolerance
-
-                if not is_inside:
-                    continue
-
-                ts = get_triangle_lerp(v, v1, v2, v3)
-                if ts == None:
+""" fragment_shader_batch (optional, used by the numpy backend)
+    :params: position:(N, 2) int array of x, y
+             depth:(N,) float array
+             varyings:list of (N, k) arrays, one per vertex shader output
+                      (float and int: k = 1, Vec2: k = 2, Vec3: k = 3)
+             derivatives:(d/dx, d/dy) lists of the flattened varyings,
+                         constant over the triangle, only passed (as a
+                         keyword) when the shader has a true
+                         uses_derivatives attribute
+    :returns: (N, 3) uint8 array of RGB colors
+"""
+# when None the per pixel fragment_shader is called through an adapter
+fragment_shader_batch = None
+
+
+class Renderer:
+    """ A render pipeline owning its mesh, camera, shaders and framebuffer.
+        Attributes have the same names and meaning as the module globals.
+        Independent instances can render concurrently (e.g. from threads)
+        as long as they don't share a camera or a framebuffer, and only one
+        of them uses worker processes (workers != 1) at a time.
+    """
+    def __init__(self, camera:Camera=None, vertices:list[list]=None,
+                 indices:list[tuple[int]]=None, screen_width:int=400,
+                 screen_height:int=400, back_fill:tuple[int]=(0x00, 0x00, 0x00)) -> None:
+        self._vertices = None
+        self._indices = None
+        self._mesh:Mesh = None
+        self.vertices = vertices if vertices != None else []
+        self.indices = indices if indices != None else []
+        self.camera = camera
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.back_fill = back_fill
+        self.cull_mode = CULL_NONE
+        self.backend = "python"
+        self.workers = 1
+        self.tile_size = 64
+        self.early_z = False
+        self.bvh:BVH = None
+        self.vertex_shader = vertex_shader
+        self.fragment_shader = fragment_shader
+        self.fragment_shader_batch = None
+        self.framebuffer:Framebuffer = None
+        self.vertex_cache_hits = 0
+        self.vertex_cache_misses = 0
+        self.instance_id = 0  # the instance being transformed, for vertex shaders
+        self.triangles_culled = 0
+        self.triangles_clipped = 0
+        self.profile = False
+        self.before_stage = []
+        self.after_stage = []
+        self.on_tile = None
+        self.incremental = False
+        # reused across frames: (indices, used vertices, corners) and the
+        # VaryingPlan of the last draw
+        self._used = None
+        self._plan:VaryingPlan = None
+        # the last render when incremental, see rerender
+        self._retained:RetainedFrame = None
+
+    # vertices/indices take the list formats of the module globals (or
+    # vertices a Mesh). Lists are converted to a Mesh again for every
+    # render, so vertices changed in place show up in the next frame.
+    @property
+    def vertices(self):
+        return self._vertices
+
+    @vertices.setter
+    def vertices(self, vertices) -> None:
+        if isinstance(vertices, Mesh):
+            self._mesh = vertices
+        elif vertices is not self._vertices:
+            self._mesh = None
+        self._vertices = vertices
+
+    @property
+    def indices(self):
+        return self._indices
+
+    @indices.setter
+    def indices(self, indices) -> None:
+        if indices is not self._indices and not isinstance(self._vertices, Mesh):
+            self._mesh = None
+        self._indices = indices
+
+    @property
+    def mesh(self) -> Mesh:
+        if self._mesh == None:
+            self._mesh = _mesh_from_lists(self._vertices, self._indices)
+        return self._mesh
+
+    @mesh.setter
+    def mesh(self, mesh:Mesh) -> None:
+        self.vertices = mesh
+
+    # re-reads list vertices/indices into the converted Mesh, which stays
+    # the same object (for a BVH or rerender built over it)
+    def _refresh_mesh(self) -> None:
+        if self._mesh == None or isinstance(self._vertices, Mesh):
+            return
+        self._mesh.assign(_mesh_from_lists(self._vertices, self._indices))
+
+    def init(self) -> None:
+        self._retained = None
+        framebuffer = self.framebuffer
+        if (framebuffer == None or
+            framebuffer.width != self.screen_width or
+            framebuffer.height != self.screen_height):
+            self.framebuffer = Framebuffer(self.screen_width, self.screen_height, self.back_fill)
+            return
+        framebuffer.back_fill = self.back_fill
+        framebuffer.clear()
+
+    def save_screen(self, file_path:str) -> None:
+        BmpSink(file_path).write(self.framebuffer)
+
+    """ render
+        :returns: a RenderStats when profile is True, otherwise None
+    """
+    def render(self) -> RenderStats | None:
+        self._refresh_mesh()
+        mesh = self.mesh
+        numbers = self._visible_triangles()
+        visible = None
+        if numbers != None:
+            visible = [ mesh.triangle(t) for t in numbers ]
+        sources = [] if self.incremental else None
+        if not self.profile and not self.before_stage and not self.after_stage:
+            cache = self.transform(visible)
+            triangles = self.assemble(visible if visible != None else mesh.triangles(),
+                                      cache, sources)
+            self.rasterize(triangles)
+            self._retain(numbers, sources, triangles)
+            return None
+
+        stats = RenderStats() if self.profile else None
+        cache = self._run_stage("transform", stats, self.transform, visible)
+        triangles = self._run_stage("assemble", stats, self.assemble,
+                                    visible if visible != None else mesh.triangles(),
+                                    cache, sources)
+        counts = self._run_stage("rasterize", stats, self.rasterize, triangles)
+        self._retain(numbers, sources, triangles)
+        if stats != None:
+            stats.triangles_submitted = mesh.triangle_count
+            stats.triangles_culled = self.triangles_culled
+            stats.triangles_clipped = self.triangles_clipped
+            stats.triangles_rasterized = len(triangles)
+            stats.vertex_cache_hits = self.vertex_cache_hits
+            stats.vertex_cache_misses = self.vertex_cache_misses
+            stats.add_pixels(counts)
+        return stats
+
+    # numbers of the triangles to draw, None: all triangles of the mesh
+    def _visible_triangles(self) -> list[int] | None:
+        bvh = self.bvh
+        if bvh == None:
+            return None
+        if bvh.mesh is not self.mesh:
+            raise ValueError("the bvh was built for another mesh")
+        # a couple of pixels, int() rounds screen positions towards zero
+        margin = 2 * self.camera.size.x / self.screen_width
+        return bvh.visible(self.camera, margin)
+
+    # sources: positions of the triangles' mesh triangles in numbers
+    def _retain(self, numbers:list[int], sources:list[int], triangles:list[tuple]) -> None:
+        if sources == None:
+            self._retained = None
+            return
+        if numbers != None:
+            sources = [ numbers[n] for n in sources ]
+        self._retained = RetainedFrame(self.mesh, self.framebuffer, self.tile_size)
+        self._retained.replace((), sources, triangles)
+
+    """ rerender
+        :params: vertices whose position or attributes changed (edited in
+                 place in the mesh or the vertex lists), mesh triangles to
+                 redraw for other reasons (e.g. a shader parameter only
+                 they use)
+        :returns: a RenderStats when profile is True, otherwise None
+    """
+    # Needs a render with incremental set before it, of the same mesh, and
+    # the same camera and screen. Only the changed triangles are
+    # transformed and assembled again, only the tiles under their old and
+    # new screen bounds are cleared and redrawn (in this process) from the
+    # retained triangles. So the cost follows the size of the change, not
+    # of the frame. Drawn tiles go to on_tile.
+    def rerender(self, vertices=(), triangles=()) -> RenderStats | None:
+        retained = self._retained
+        mesh = self.mesh
+        if retained == None or retained.mesh is not mesh or retained.framebuffer is not self.framebuffer:
+            raise ValueError("rerender needs a render of the same mesh with incremental set")
+        self._refresh_mesh()
+        numbers = sorted(retained.vertex_triangles(vertices).union(triangles))
+        changed = [ mesh.triangle(t) for t in numbers ]
+
+        stats = RenderStats() if self.profile else None
+        cache = self._run_stage("transform", stats, self.transform, changed)
+        sources = []
+        assembled = self._run_stage("assemble", stats, self.assemble, changed, cache, sources)
+        dirty = retained.replace(numbers, [ numbers[n] for n in sources ], assembled)
+        keys = sorted(dirty, key=lambda key: (key[1], key[0]))
+        counts = self._run_stage("rasterize", stats, self._redraw, keys)
+        if stats != None:
+            stats.triangles_submitted = len(numbers)
+            stats.triangles_culled = self.triangles_culled
+            stats.triangles_clipped = self.triangles_clipped
+            stats.triangles_rasterized = len(assembled)
+            stats.vertex_cache_hits = self.vertex_cache_hits
+            stats.vertex_cache_misses = self.vertex_cache_misses
+            stats.add_pixels(counts)
+        return stats
+
+    # clears the tiles and draws their retained triangles
+    def _redraw(self, keys:list[tuple[int]]) -> tuple[int]:
+        retained = self._retained
+        framebuffer = self.framebuffer
+        rasterizer, shader = self._shader()
+        draw_triangle = rasterizer.draw_triangle
+        counts = []
+        for key in keys:
+            rect = retained.rect(key)
+            framebuffer.clear_rect(*rect)
+            triangles = retained.tile_triangles(key)
+            if triangles:
+                plan = self._plan
+                if plan == None or not plan.matches(triangles[0][3]):
+                    plan = self._plan = VaryingPlan(triangles[0][3])
+                if self.early_z:
+                    triangles.sort(key=nearest_depth)
+                    counts.append(draw_triangles(triangles, framebuffer, rect, draw_triangle, shader, plan))
+                else:
+                    counts.append(_sum_counts(
+                            draw_triangle(p1, p2, p3, b1, b2, b3, framebuffer, rect, shader, plan)
+                            for p1, p2, p3, b1, b2, b3 in triangles
+                        ))
+            if self.on_tile != None:
+                self.on_tile(framebuffer, rect)
+        return _sum_counts(counts)
+
+    """ render_sequence
+        :params: number of frames, update(frame number, renderer) called
+                 before each frame to move the camera, change the mesh...,
+                 optionally a FrameSink every frame is written to
+        :returns: a generator rendering a frame per step and yielding the
+                  framebuffer, which is only valid until the next step
+    """
+    # The framebuffer is cleared instead of reallocated, the mesh, its list
+    # of used vertices and the varying plan are kept from frame to frame,
+    # so a frame costs about as much as its rasterization.
+    def render_sequence(self, count:int, update=None, sink:FrameSink=None):
+        for n in range(count):
+            if update != None:
+                update(n, self)
+            self.init()
+            self.render()
+            if sink != None:
+                sink.write(self.framebuffer)
+            yield self.framebuffer
+
+    """ render_instanced
+        :params: per instance transforms from mesh to world space, Mat4 or
+                 3x4 or 4x4 affine (see instancing.as_mat4)
+        :returns: a RenderStats when profile is True, otherwise None
+    """
+    # The mesh is shared by all instances, each instance's transform is
+    # combined with the camera's view transform once and its vertices are
+    # taken to view space in one pass. Vertex attributes (e.g. normals) are
+    # not transformed, vertex shaders can read instance_id. All instances
+    # are rasterized as one draw.
+    def render_instanced(self, transforms) -> RenderStats | None:
+        self._refresh_mesh()
+        mesh = self.mesh
+        view = self.camera.view_matrix()
+        stats = RenderStats() if self.profile else None
+        self._retained = None
+        triangles = []
+        instances = hits = misses = culled = clipped = 0
+        for n, transform in enumerate(transforms):
+            self.instance_id = n
+            instances += 1
+            matrix = view.mult(as_mat4(transform))
+            cache = self._run_stage("transform", stats, self.transform, None, matrix)
+            triangles += self._run_stage("assemble", stats, self.assemble, mesh.triangles(), cache)
+            hits += self.vertex_cache_hits
+            misses += self.vertex_cache_misses
+            culled += self.triangles_culled
+            clipped += self.triangles_clipped
+        counts = self._run_stage("rasterize", stats, self.rasterize, triangles)
+
+        self.vertex_cache_hits = hits
+        self.vertex_cache_misses = misses
+        self.triangles_culled = culled
+        self.triangles_clipped = clipped
+        if stats != None:
+            stats.triangles_submitted = mesh.triangle_count * instances
+            stats.triangles_culled = culled
+            stats.triangles_clipped = clipped
+            stats.triangles_rasterized = len(triangles)
+            stats.vertex_cache_hits = hits
+            stats.vertex_cache_misses = misses
+            stats.add_pixels(counts)
+        return stats
+
+    def _run_stage(self, name:str, stats:RenderStats, stage, *args):
+        for callback in self.before_stage:
+            callback(name, self)
+        if stats != None:
+            start = perf_counter()
+            result = stage(*args)
+            stats.times[name] = stats.times.get(name, 0.0) + perf_counter() - start
+        else:
+            result = stage(*args)
+        for callback in self.after_stage:
+            callback(name, self)
+        return result
+
+    """ transform
+        :params: triangles as tuples of three vertex indices (default: all
+                 triangles of the mesh), optionally a mesh to view Mat4
+                 used instead of the camera's transform
+        :returns: post-transform vertex cache, vertex index ->
+                  (view position, screen position, vertex shader buffer)
+    """
+    # Every vertex used by the triangles is projected, mapped to the screen
+    # and shaded once, however many triangles share it.
+    def transform(self, triangle_indices=None, matrix:Mat4=None) -> dict[int, tuple]:
+        camera = self.camera
+        mesh = self.mesh
+        vertex_shader = self.vertex_shader
+        scalar = self.screen_width / camera.size.x
+        offset = Vec3(self.screen_width / 2, self.screen_height / 2, 0.0)
+
+        if triangle_indices != None:
+            used, corners = _used_vertices(triangle_indices)
+        else:
+            # the used vertices only depend on the indices
+            if self._used == None or self._used[0] is not mesh.indices:
+                self._used = (mesh.indices,) + _used_vertices(mesh.triangles())
+            _, used, corners = self._used
+
+        position = mesh.position
+        vertex_attributes = mesh.vertex_attributes
+        if matrix != None:
+            views = transform_positions(matrix, mesh.positions, used)
+        else:
+            views = camera.world_to_view_many([ position(i) for i in used ])
+        projected = camera.view_to_screen_many(views)
+        cache = {}
+        for i, view, pos in zip(used, views, projected):
+            # like vec3_to_vec3i, in place
+            pos.scale(scalar).add(offset)
+            pos.set(int(pos.x), int(pos.y), int(pos.z))
+            # the vertex shader gets the screen position followed by the
+            # attributes
+            cache[i] = (view, pos, vertex_shader([pos] + vertex_attributes(i)))
+
+        self.vertex_cache_hits = corners - len(used)
+        self.vertex_cache_misses = len(used)
+        return cache
+
+    """ assemble
+        :params: triangles as tuples of three vertex indices, the cache from
+                 transform, optionally a list the position (in
+                 triangle_indices) of each result's triangle is appended to
+        :returns: clipped and culled triangles as (p1, p2, p3, b1, b2, b3)
+                  with integer screen positions and vertex shader buffers
+    """
+    def assemble(self, triangle_indices, cache:dict[int, tuple], sources:list[int]=None) -> list[tuple]:
+        camera = self.camera
+        near, far = camera.near, camera.far
+        cull_mode = self.cull_mode
+        scalar = self.screen_width / camera.size.x
+        offset = Vec3(self.screen_width / 2, self.screen_height / 2, 0.0)
+
+        triangles = []
+        culled = clipped = 0
+        for n, (i1, i2, i3) in enumerate(triangle_indices):
+            parts = clip_triangle(cache[i1], cache[i2], cache[i3], near, far)
+            if not parts:
+                clipped += 1
+            for v1, v2, v3 in parts:
+                p1, p2, p3 = [
+                    v[1] if v[1] != None else
+                    vec3_to_vec3i(camera.view_to_screen(v[0]).scale(scalar).add(offset))
+                    for v in (v1, v2, v3)
+                ]
+                if is_culled(p1, p2, p3, cull_mode):
+                    culled += 1
                     continue
-                t, s = ts
-
-                depth = tlerp(
-                    triangle[0][0].z,
-                    triangle[1][0].z,
-                    triangle[2][0].z,
-                    t, s
+                triangles.append((p1, p2, p3, v1[2], v2[2], v3[2]))
+                if sources != None:
+                    sources.append(n)
+
+        self.triangles_culled = culled
+        self.triangles_clipped = clipped
+        return triangles
+
+    """ rasterize
+        :params: triangles from assemble
+        :returns: pixel counts (tested, covered, shaded)
+    """
+    def rasterize(self, triangles:list[tuple]) -> tuple[int]:
+        rasterizer, shader = self._shader()
+        framebuffer = self.framebuffer
+        if not triangles:
+            return (0, 0, 0)
+        # the varying layout is the same for the whole draw (and usually
+        # for the next one)
+        plan = self._plan
+        if plan == None or not plan.matches(triangles[0][3]):
+            plan = self._plan = VaryingPlan(triangles[0][3])
+        if self.early_z:
+            # the nearest triangles fill the depth buffer first, so the
+            # per pixel depth test rejects hidden pixels before their
+            # varyings are interpolated and shaded
+            triangles = sorted(triangles, key=nearest_depth)
+
+        if self.workers == 1 and self.on_tile == None:
+            draw_triangle = rasterizer.draw_triangle
+            rect = (0, 0, framebuffer.width, framebuffer.height)
+            if self.early_z:
+                return draw_triangles(triangles, framebuffer, rect, draw_triangle, shader, plan)
+            return _sum_counts(
+                    draw_triangle(p1, p2, p3, b1, b2, b3, framebuffer, rect, shader, plan)
+                    for p1, p2, p3, b1, b2, b3 in triangles
                 )
+        return draw_tiled(triangles, framebuffer, rasterizer, shader, plan,
+                          self.workers, self.tile_size, self.early_z, self.on_tile)
+
+    # the raster backend module and the fragment shader for it
+    def _shader(self) -> tuple:
+        rasterizer = _get_backend(self.backend)
+        if self.backend == "numpy":
+            shader = self.fragment_shader_batch
+            if shader == None:
+                shader = rasterizer.per_pixel(self.fragment_shader)
+        else:
+            shader = self.fragment_shader
+        return (rasterizer, shader)
+
+
+# module level API, a thin shim over a default Renderer
+_default = Renderer()
+
+_SHARED = (
+    "vertices", "indices", "camera", "screen_width", "screen_height",
+    "back_fill", "cull_mode", "backend", "workers", "tile_size",
+    "vertex_shader", "fragment_shader", "fragment_shader_batch", "framebuffer",
+    "early_z", "bvh", "profile", "before_stage", "after_stage", "on_tile",
+    "incremental"
+)
+
+# copies the module globals (set by scripts) to the default renderer
+def _sync() -> Renderer:
+    state = globals()
+    for name in _SHARED:
+        setattr(_default, name, state[name])
+    return _default
 
-                d, _, _, _ = _screen[screen_width * y + x]
-                if depth > d and d != -1:
-                    continue
-
-                buffer = [
-                    Vec3(x, y, depth)
-                ]
-
-                for i in range(len(buffers[0])):
-                    e1 = buffers[0][i]
-                    e2 = buffers[1][i]
-                    e3 = buffers[2][i]
-
-                    e = None
-
-                    if isinstance(e1, float):
-                        e = tlerp(e1, e2, e3, t, s)
-                    elif isinstance(e1, int):
-                        e = int(tlerp(e1, e2, e3, t, s))
-                    elif isinstance(e1, Vec2):
-                        e = Vec2(
-                            tlerp(e1.x, e2.x, e3.x, t, s),
-                            tlerp(e1.y, e2.y, e3.y, t, s)
-                        )
-                    elif isinstance(e1, Vec3):
-                        e = Vec3(
-                            tlerp(e1.x, e2.x, e3.x, t, s),
-                            tlerp(e1.y, e2.y, e3.y, t, s),
-                            tlerp(e1.z, e2.z, e3.z, t, s)
-                        )
-
-                    if e == None:
-                        continue
-
-                    buffer.append(e)
-
-                r, g, b = fragment_shader(buffer)
-
-                r = _clamp(r, 0, 255)
-                g = _clamp(g, 0, 255)
-                b = _clamp(b, 0, 255)
-
-                _screen[screen_width * y + x] = (depth, r, g, b)
+def init() -> None:
+    global framebuffer
+    _sync().init()
+    framebuffer = _default.framebuffer
 
+def save_screen(file_path:str) -> None:
+    _sync().save_screen(file_path)
+
+def render_sequence(count:int, update=None, sink:FrameSink=None):
+    """ like Renderer.render_sequence, update gets the default Renderer """
+    global framebuffer
+    renderer = _sync()
+    for frame in renderer.render_sequence(count, update, sink):
+        framebuffer = frame
+        yield frame
+
+def render() -> RenderStats | None:
+    global vertex_cache_hits, vertex_cache_misses
+    stats = _sync().render()
+    vertex_cache_hits = _default.vertex_cache_hits
+    vertex_cache_misses = _default.vertex_cache_misses
+    return stats
+
+def render_instanced(transforms) -> RenderStats | None:
+    global vertex_cache_hits, vertex_cache_misses
+    renderer = _sync()
+    # instance_id is set before each instance's transform stage, where the
+    # vertex shader runs
+    renderer.before_stage = before_stage + [ _mirror_instance_id ]
+    try:
+        stats = renderer.render_instanced(transforms)
+    finally:
+        renderer.before_stage = before_stage
+    vertex_cache_hits = _default.vertex_cache_hits
+    vertex_cache_misses = _default.vertex_cache_misses
+    return stats
+
+def _mirror_instance_id(stage:str, renderer:Renderer) -> None:
+    global instance_id
+    instance_id = renderer.instance_id
+
+def rerender(vertices=(), triangles=()) -> RenderStats | None:
+    global vertex_cache_hits, vertex_cache_misses
+    stats = _sync().rerender(vertices, triangles)
+    vertex_cache_hits = _default.vertex_cache_hits
+    vertex_cache_misses = _default.vertex_cache_misses
+    return stats
@@ -0,0 +1,114 @@
+import os
+import select
+
+from .bitmap import write_bitmap
+from .framebuffer import Framebuffer
+
+
+class FrameSink:
+    """ Where rendered frames go. write is called once per frame with the
+        framebuffer, close when done (sinks are context managers).
+    """
+    def write(self, framebuffer:Framebuffer) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class BmpSink(FrameSink):
+    """ writes every frame to the same BMP file """
+    def __init__(self, file_path:str) -> None:
+        self.file_path = file_path
+
+    def write(self, framebuffer:Framebuffer) -> None:
+        with open(self.file_path, "wb") as file:
+            write_bitmap(file, framebuffer.width, framebuffer.height, framebuffer.color)
+
+class BmpSequenceSink(FrameSink):
+    """ writes numbered BMP files, pattern is formatted with the frame
+        number, e.g. "frames/{:04d}.bmp"
+    """
+    def __init__(self, pattern:str, start:int=0) -> None:
+        self.pattern = pattern
+        self.frame = start
+
+    def write(self, framebuffer:Framebuffer) -> None:
+        with open(self.pattern.format(self.frame), "wb") as file:
+            write_bitmap(file, framebuffer.width, framebuffer.height, framebuffer.color)
+        self.frame += 1
+
+class RawPipeSink(FrameSink):
+    """ Writes raw frames, packed rgb24 or bgr24 with the top row first
+        (unless flip is False), to a file descriptor or binary file object:
+        stdout, a FIFO, a subprocess' stdin...
+        e.g. ffmpeg -f rawvideo -pix_fmt rgb24 -s 640x480 -r 30 -i - out.mp4
+    """
+    def __init__(self, target, pixel_format:str="rgb24", flip:bool=True) -> None:
+        if pixel_format not in ("rgb24", "bgr24"):
+            raise ValueError(f"unknown pixel format: {pixel_format}")
+        self.pixel_format = pixel_format
+        self.flip = flip
+        self._file = None
+        self._fd = None
+        if isinstance(target, int):
+            self._fd = target
+        else:
+            try:
+                self._fd = target.fileno()
+                # data already buffered in the file object goes first
+                target.flush()
+            except (AttributeError, OSError):
+                self._file = target
+        self._frame = bytearray()
+
+    def write(self, framebuffer:Framebuffer) -> None:
+        frame = self._convert(framebuffer)
+        if self._fd != None:
+            _write_all(self._fd, frame)
+        else:
+            self._file.write(frame)
+
+    def close(self) -> None:
+        if self._file != None:
+            self._file.flush()
+
+    def _convert(self, framebuffer:Framebuffer) -> memoryview:
+        """ the frame in the output layout, in a buffer reused per frame """
+        color = memoryview(framebuffer.color).cast("B")
+        if not self.flip and self.pixel_format == "bgr24":
+            return color
+
+        size = len(color)
+        if len(self._frame) != size:
+            self._frame = bytearray(size)
+        frame = self._frame
+        if self.flip:
+            row_size = 3 * framebuffer.width
+            end = size
+            for start in range(0, size, row_size):
+                frame[end - row_size:end] = color[start:start + row_size]
+                end -= row_size
+        else:
+            frame[:] = color
+        if self.pixel_format == "rgb24":
+            frame[0::3], frame[2::3] = frame[2::3], frame[0::3]
+        return memoryview(frame)
+
+# Blocking descriptors block in os.write while the reader is behind, non
+# blocking ones wait in select, either way the renderer is held back by
+# the consumer instead of buffering frames without bound.
+def _write_all(fd:int, data) -> None:
+    view = memoryview(data).cast("B")
+    while view:
+        try:
+            n = os.write(fd, view)
+        except BlockingIOError:
+            select.select([], [ fd ], [])
+            continue
+        view = view[n:]
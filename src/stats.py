@@ -0,0 +1,60 @@
+STAGES = ("transform", "assemble", "rasterize")
+
+
+class RenderStats:
+    """ Counters and timings of one render(), returned when profiling.
+        triangles: submitted (in the mesh), culled (back faces), clipped
+                   (entirely outside near/far), rasterized (after
+                   clipping, can be more than submitted)
+        pixels: tested (edge functions evaluated), covered (inside a
+                triangle), depth_rejected (covered, failed the depth test),
+                shaded (fragment shader called)
+        times: stage name -> wall time in seconds
+    """
+    def __init__(self) -> None:
+        self.triangles_submitted = 0
+        self.triangles_culled = 0
+        self.triangles_clipped = 0
+        self.triangles_rasterized = 0
+        self.vertex_cache_hits = 0
+        self.vertex_cache_misses = 0
+        self.pixels_tested = 0
+        self.pixels_covered = 0
+        self.pixels_shaded = 0
+        self.times = {}
+
+    @property
+    def pixels_depth_rejected(self) -> int:
+        return self.pixels_covered - self.pixels_shaded
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.times.values())
+
+    def add_pixels(self, counts:tuple[int]) -> None:
+        """ counts: (tested, covered, shaded) from draw_triangle """
+        tested, covered, shaded = counts
+        self.pixels_tested += tested
+        self.pixels_covered += covered
+        self.pixels_shaded += shaded
+
+    def as_dict(self) -> dict:
+        result = {
+            name: getattr(self, name) for name in (
+                "triangles_submitted", "triangles_culled", "triangles_clipped",
+                "triangles_rasterized", "vertex_cache_hits", "vertex_cache_misses",
+                "pixels_tested", "pixels_covered", "pixels_depth_rejected", "pixels_shaded"
+            )
+        }
+        result["times"] = dict(self.times)
+        return result
+
+    def __str__(self) -> str:
+        times = "  ".join(f"{stage} {t * 1000:.1f}ms" for stage, t in self.times.items())
+        return (
+            f"triangles: {self.triangles_submitted} submitted, {self.triangles_culled} culled, "
+            f"{self.triangles_clipped} clipped, {self.triangles_rasterized} rasterized\n"
+            f"pixels: {self.pixels_tested} tested, {self.pixels_covered} covered, "
+            f"{self.pixels_depth_rejected} depth rejected, {self.pixels_shaded} shaded\n"
+            f"times: {times}"
+        )
@@ -0,0 +1,245 @@
+from math import floor, log2, sqrt
+
+from .bitmap import read_bitmap
+from .varyings import FragmentBuffer
+
+
+# filter: how texels are combined
+NEAREST   = "nearest"    # nearest texel of the nearest mip level
+BILINEAR  = "bilinear"   # 2x2 texels of the nearest mip level
+TRILINEAR = "trilinear"  # bilinear in the two nearest mip levels, blended
+
+# wrap: what coordinates outside of 0..1 read
+REPEAT = "repeat"
+CLAMP  = "clamp"
+
+
+class Texture:
+    """ An RGB image with mip levels, sampled by (u, v) in 0..1, u to the
+        right and v up (the first row of the image is at v = 0, like BMP
+        and the framebuffer).
+        Each level is stored in tile_size x tile_size tiles, so texels that
+        are near in the image are near in memory. The mip levels are made
+        once, each a 2x2 box filter of the previous one, down to 1x1.
+    """
+    def __init__(self, width:int, height:int, pixel_data, wrap:str=REPEAT,
+                 tile_size:int=8) -> None:
+        """ pixel_data: packed 24 bit BGR, first row at the bottom (like
+                        Framebuffer.color and read_bitmap)
+        """
+        if wrap not in (REPEAT, CLAMP):
+            raise ValueError(f"unknown wrap mode: {wrap}")
+        self.width = width
+        self.height = height
+        self.wrap = wrap
+        self.tile_size = tile_size
+        # per level: (width, height, tiles per row, RGB bytes in tile order)
+        self.levels = []
+
+        view = memoryview(pixel_data).cast("B")
+        rgb = bytearray(3 * width * height)
+        rgb[0::3] = view[2::3]
+        rgb[1::3] = view[1::3]
+        rgb[2::3] = view[0::3]
+        while True:
+            self.levels.append(self._tile(width, height, rgb))
+            if width == 1 and height == 1:
+                break
+            width, height, rgb = _downsample(width, height, rgb)
+
+    @classmethod
+    def load(cls, file_path:str, wrap:str=REPEAT, tile_size:int=8):
+        width, height, pixel_data = read_bitmap(file_path)
+        return cls(width, height, pixel_data, wrap, tile_size)
+
+    def _tile(self, width:int, height:int, rgb:bytearray) -> tuple:
+        s = self.tile_size
+        columns = (width + s - 1) // s
+        rows = (height + s - 1) // s
+        data = bytearray(3 * s * s * columns * rows)
+        for y in range(height):
+            for x0 in range(0, width, s):
+                n = min(s, width - x0)
+                i = self._index(columns, x0, y)
+                data[i:i + 3 * n] = rgb[3 * (y * width + x0):3 * (y * width + x0 + n)]
+        return (width, height, columns, data)
+
+    def _index(self, columns:int, x:int, y:int) -> int:
+        s = self.tile_size
+        tile = (y // s) * columns + x // s
+        return 3 * (tile * s * s + (y % s) * s + x % s)
+
+    def texel(self, level:int, x:int, y:int) -> tuple[int]:
+        """ RGB of texel x, y of a mip level, wrapped """
+        width, height, columns, data = self.levels[level]
+        if self.wrap == REPEAT:
+            x %= width
+            y %= height
+        else:
+            x = min(max(x, 0), width - 1)
+            y = min(max(y, 0), height - 1)
+        i = self._index(columns, x, y)
+        return (data[i], data[i + 1], data[i + 2])
+
+    """ lod
+        :params: screen space derivatives of u and v
+        :returns: the mip level (fractional) for a pixel covering that
+                  much of the texture, 0 when magnified
+    """
+    def lod(self, du_dx:float, dv_dx:float, du_dy:float, dv_dy:float) -> float:
+        x = sqrt((du_dx * self.width) ** 2 + (dv_dx * self.height) ** 2)
+        y = sqrt((du_dy * self.width) ** 2 + (dv_dy * self.height) ** 2)
+        texels = max(x, y)
+        if texels <= 1.0:
+            return 0.0
+        return min(log2(texels), len(self.levels) - 1)
+
+    """ sample
+        :params: texture coordinates, mip level (see lod), filter
+        :returns: RGB as floats (max 255)
+    """
+    def sample(self, u:float, v:float, lod:float=0.0, filter:str=BILINEAR) -> tuple[float]:
+        last = len(self.levels) - 1
+        lod = min(max(lod, 0.0), last)
+        if filter == TRILINEAR:
+            level = int(lod)
+            t = lod - level
+            a = self._bilinear(level, u, v)
+            if t == 0.0 or level == last:
+                return a
+            b = self._bilinear(level + 1, u, v)
+            return (
+                a[0] + (b[0] - a[0]) * t,
+                a[1] + (b[1] - a[1]) * t,
+                a[2] + (b[2] - a[2]) * t
+            )
+        level = int(lod + 0.5)
+        if filter == BILINEAR:
+            return self._bilinear(level, u, v)
+        if filter == NEAREST:
+            width, height = self.levels[level][:2]
+            return self.texel(level, floor(u * width), floor(v * height))
+        raise ValueError(f"unknown filter: {filter}")
+
+    """ sample_fragment
+        :params: the fragment shader's buffer, the index of a Vec2 varying
+                 holding (u, v) in it, filter
+        :returns: RGB as floats (max 255)
+    """
+    # The mip level comes from the derivatives of the texture coordinates
+    # over the triangle, which the raster backends put into the buffer.
+    def sample_fragment(self, buffer:FragmentBuffer, n:int, filter:str=TRILINEAR) -> tuple[float]:
+        uv = buffer[n]
+        (du_dx, dv_dx), (du_dy, dv_dy) = buffer.derivatives(n)
+        return self.sample(uv.x, uv.y, self.lod(du_dx, dv_dx, du_dy, dv_dy), filter)
+
+    """ sample_many (numpy)
+        :params: uv:(N, 2) array, mip level (see lod, e.g. from the
+                 derivatives a batch shader with uses_derivatives gets),
+                 filter
+        :returns: (N, 3) float array of RGB (max 255)
+    """
+    def sample_many(self, uv, lod:float=0.0, filter:str=BILINEAR):
+        import numpy as np
+        uv = np.asarray(uv, dtype=np.float64)
+        u, v = uv[:, 0], uv[:, 1]
+        last = len(self.levels) - 1
+        lod = min(max(lod, 0.0), last)
+        if filter == TRILINEAR:
+            level = int(lod)
+            t = lod - level
+            a = self._bilinear_many(level, u, v)
+            if t == 0.0 or level == last:
+                return a
+            return a + (self._bilinear_many(level + 1, u, v) - a) * t
+        level = int(lod + 0.5)
+        if filter == BILINEAR:
+            return self._bilinear_many(level, u, v)
+        if filter == NEAREST:
+            width, height = self.levels[level][:2]
+            x = np.floor(u * width).astype(np.int64)
+            y = np.floor(v * height).astype(np.int64)
+            return self._texels_many(level, x, y).astype(np.float64)
+        raise ValueError(f"unknown filter: {filter}")
+
+    def _texels_many(self, level:int, x, y):
+        import numpy as np
+        width, height, columns, data = self.levels[level]
+        if self.wrap == REPEAT:
+            x = x % width
+            y = y % height
+        else:
+            x = np.clip(x, 0, width - 1)
+            y = np.clip(y, 0, height - 1)
+        s = self.tile_size
+        i = ((y // s) * columns + x // s) * (s * s) + (y % s) * s + x % s
+        return np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)[i]
+
+    def _bilinear_many(self, level:int, u, v):
+        import numpy as np
+        width, height = self.levels[level][:2]
+        x = u * width - 0.5
+        y = v * height - 0.5
+        x0 = np.floor(x)
+        y0 = np.floor(y)
+        fx = (x - x0)[:, None]
+        fy = (y - y0)[:, None]
+        x0 = x0.astype(np.int64)
+        y0 = y0.astype(np.int64)
+        c00 = self._texels_many(level, x0, y0)
+        c10 = self._texels_many(level, x0 + 1, y0)
+        c01 = self._texels_many(level, x0, y0 + 1)
+        c11 = self._texels_many(level, x0 + 1, y0 + 1)
+        return ((1 - fx) * (1 - fy) * c00 + fx * (1 - fy) * c10 +
+                (1 - fx) * fy * c01 + fx * fy * c11)
+
+    def _bilinear(self, level:int, u:float, v:float) -> tuple[float]:
+        width, height = self.levels[level][:2]
+        # texel centers are at (i + 0.5) / width
+        x = u * width - 0.5
+        y = v * height - 0.5
+        x0 = floor(x)
+        y0 = floor(y)
+        fx = x - x0
+        fy = y - y0
+        c00 = self.texel(level, x0, y0)
+        c10 = self.texel(level, x0 + 1, y0)
+        c01 = self.texel(level, x0, y0 + 1)
+        c11 = self.texel(level, x0 + 1, y0 + 1)
+        w00 = (1 - fx) * (1 - fy)
+        w10 = fx * (1 - fy)
+        w01 = (1 - fx) * fy
+        w11 = fx * fy
+        return (
+            w00 * c00[0] + w10 * c10[0] + w01 * c01[0] + w11 * c11[0],
+            w00 * c00[1] + w10 * c10[1] + w01 * c01[1] + w11 * c11[1],
+            w00 * c00[2] + w10 * c10[2] + w01 * c01[2] + w11 * c11[2]
+        )
+
+# the next mip level, a 2x2 box filter. An odd width or height folds its
+# last column or row into the last texel (which averages 3 instead of 2),
+# so no texel is dropped.
+def _downsample(width:int, height:int, rgb:bytearray) -> tuple:
+    w = max(width // 2, 1)
+    h = max(height // 2, 1)
+    columns = _footprints(width, w)
+    rows = _footprints(height, h)
+    out = bytearray(3 * w * h)
+    o = 0
+    for ys in rows:
+        for xs in columns:
+            texels = [ 3 * (y * width + x) for y in ys for x in xs ]
+            n = len(texels)
+            for k in range(3):
+                out[o + k] = (sum(rgb[i + k] for i in texels) + n // 2) // n
+            o += 3
+    return (w, h, out)
+
+# per texel of the smaller level, the texels of the larger level it covers
+def _footprints(size:int, smaller:int) -> list[tuple[int]]:
+    if size == 1:
+        return [ (0,) ]
+    footprints = [ (2 * i, 2 * i + 1) for i in range(smaller) ]
+    if size % 2:
+        footprints[-1] += (size - 1,)
+    return footprints
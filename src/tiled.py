@@ -0,0 +1,167 @@
+import os
+from functools import partial
+from multiprocessing import get_all_start_methods, get_context
+from multiprocessing.shared_memory import SharedMemory
+from concurrent.futures import ProcessPoolExecutor
+
+from .vmath import Vec3
+from .framebuffer import Framebuffer
+from .hiz import draw_triangles
+
+
+# (triangles, bins, framebuffer, rasterizer, shader, plan, tile_size,
+# early_z) of the running draw_tiled call with workers. Workers are forked,
+# so they inherit it together with the shaders (even ones defined in a
+# script's __main__) and the shared memory mapping of the framebuffer, only
+# tile keys are sent. Drawing in this process passes the job explicitly,
+# so renderers in threads don't share it.
+_job = None
+
+
+""" bin_triangles
+    :params: triangles as (p1, p2, p3, b1, b2, b3) with integer screen
+             positions, screen size and tile size in pixels
+    :returns: {(tile x, tile y): [triangle index, ...]} in submission order
+"""
+def bin_triangles(triangles:list[tuple], width:int, height:int,
+                  tile_size:int) -> dict[tuple[int], list[int]]:
+    bins = {}
+    for n, (p1, p2, p3, _, _, _) in enumerate(triangles):
+        for key in triangle_tiles(p1, p2, p3, width, height, tile_size):
+            tile = bins.get(key)
+            if tile == None:
+                bins[key] = tile = []
+            tile.append(n)
+    return bins
+
+""" triangle_tiles
+    :params: integer screen positions, screen size and tile size in pixels
+    :returns: the (tile x, tile y) keys the triangle's bounds overlap
+"""
+def triangle_tiles(p1:Vec3, p2:Vec3, p3:Vec3, width:int, height:int,
+                   tile_size:int) -> list[tuple[int]]:
+    x0 = max(min(p1.x, p2.x, p3.x), 0)
+    y0 = max(min(p1.y, p2.y, p3.y), 0)
+    x1 = min(max(p1.x, p2.x, p3.x), width - 1)
+    y1 = min(max(p1.y, p2.y, p3.y), height - 1)
+    if x0 > x1 or y0 > y1:
+        return []
+    return [
+        (tx, ty)
+        for ty in range(y0 // tile_size, y1 // tile_size + 1)
+        for tx in range(x0 // tile_size, x1 // tile_size + 1)
+    ]
+
+def tile_rect(key:tuple[int], width:int, height:int, tile_size:int) -> tuple[int]:
+    """ the pixels (x0, y0, x1, y1) of a tile, exclusive maximum """
+    tx, ty = key
+    return (
+        tx * tile_size,
+        ty * tile_size,
+        min((tx + 1) * tile_size, width),
+        min((ty + 1) * tile_size, height)
+    )
+
+def _draw_forked(key:tuple[int]) -> tuple[int]:
+    return _draw_tile(_job, key)
+
+def _draw_tile(job:tuple, key:tuple[int]) -> tuple[int]:
+    triangles, bins, framebuffer, rasterizer, shader, plan, tile_size, early_z = job
+    rect = tile_rect(key, framebuffer.width, framebuffer.height, tile_size)
+    draw_triangle = rasterizer.draw_triangle
+    if early_z:
+        return draw_triangles([ triangles[n] for n in bins[key] ], framebuffer, rect,
+                              draw_triangle, shader, plan)
+    tested = covered = shaded = 0
+    for n in bins[key]:
+        p1, p2, p3, b1, b2, b3 = triangles[n]
+        t, c, s = draw_triangle(p1, p2, p3, b1, b2, b3, framebuffer, rect, shader, plan)
+        tested += t
+        covered += c
+        shaded += s
+    return (tested, covered, shaded)
+
+""" draw_tiled
+    :params: triangles as (p1, p2, p3, b1, b2, b3), the framebuffer, the
+             raster backend module, its fragment shader and VaryingPlan, the
+             number of worker processes (None: one per core), the tile
+             size, whether to skip occluded triangles (hiz.draw_triangles)
+             and on_tile(framebuffer, rect) called after each tile is drawn
+    :returns: pixel counts (tested, covered, shaded) summed over the tiles
+"""
+# Every tile is drawn by one worker with the triangles in submission order,
+# so the result is identical to drawing without tiles. Without fork (e.g.
+# on Windows) the tiles are drawn in this process. With workers, on_tile
+# gets the shared framebuffer the workers draw into.
+def draw_tiled(triangles:list[tuple], framebuffer:Framebuffer, rasterizer,
+               shader, plan=None, workers:int=None, tile_size:int=64,
+               early_z:bool=False, on_tile=None) -> tuple[int]:
+    global _job
+    if workers == None:
+        workers = os.cpu_count() or 1
+    width, height = framebuffer.width, framebuffer.height
+    bins = bin_triangles(triangles, width, height, tile_size)
+    keys = sorted(bins, key=lambda key: (key[1], key[0]))
+    if not keys:
+        return (0, 0, 0)
+
+    if workers <= 1 or "fork" not in get_all_start_methods():
+        job = (triangles, bins, framebuffer, rasterizer, shader, plan, tile_size, early_z)
+        counts = map(partial(_draw_tile, job), keys)
+        return _sum_counts(_tiles_drawn(keys, counts, framebuffer, tile_size, on_tile))
+
+    depth_size = 4 * width * height
+    color_size = 3 * width * height
+    depth_shm = SharedMemory(create=True, size=depth_size)
+    color_shm = SharedMemory(create=True, size=color_size)
+    shared = None
+    try:
+        depth_shm.buf[:depth_size] = memoryview(framebuffer.depth).cast("B")
+        color_shm.buf[:color_size] = framebuffer.color
+        shared = Framebuffer.from_buffers(
+                width, height,
+                depth_shm.buf[:depth_size],
+                color_shm.buf[:color_size],
+                framebuffer.back_fill
+            )
+        _job = (triangles, bins, shared, rasterizer, shader, plan, tile_size, early_z)
+
+        chunksize = max(1, len(keys) // (4 * workers))
+        with ProcessPoolExecutor(workers, mp_context=get_context("fork")) as executor:
+            counts = _sum_counts(_tiles_drawn(
+                    keys, executor.map(_draw_forked, keys, chunksize=chunksize),
+                    shared, tile_size, on_tile))
+
+        memoryview(framebuffer.depth).cast("B")[:] = depth_shm.buf[:depth_size]
+        framebuffer.color[:] = color_shm.buf[:color_size]
+        return counts
+    finally:
+        _job = None
+        if shared != None:
+            shared.depth.release()
+            shared.color.release()
+        for shm in (depth_shm, color_shm):
+            shm.close()
+            shm.unlink()
+
+# passes the counts through, calling on_tile as the tiles complete
+def _tiles_drawn(keys:list[tuple[int]], counts, framebuffer:Framebuffer,
+                 tile_size:int, on_tile):
+    if on_tile == None:
+        return counts
+    return _notify(keys, counts, framebuffer, tile_size, on_tile)
+
+def _notify(keys:list[tuple[int]], counts, framebuffer:Framebuffer,
+            tile_size:int, on_tile):
+    width, height = framebuffer.width, framebuffer.height
+    for key, count in zip(keys, counts):
+        on_tile(framebuffer, tile_rect(key, width, height, tile_size))
+        yield count
+
+def _sum_counts(counts) -> tuple[int]:
+    tested = covered = shaded = 0
+    for t, c, s in counts:
+        tested += t
+        covered += c
+        shaded += s
+    return (tested, covered, shaded)
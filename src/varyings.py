@@ -0,0 +1,96 @@
+from .vmath import Vec2, Vec3
+
+
+_SIZES = { float: 1, int: 1, Vec2: 2, Vec3: 3 }
+
+class FragmentBuffer(list):
+    """ The list [position, varyings...] fragment shaders get, which also
+        holds the screen space derivatives of the varyings, constant over a
+        triangle. ddx and ddy are flat like VaryingPlan.flatten, offsets
+        has (offset, size) per varying.
+    """
+    __slots__ = ("offsets", "ddx", "ddy")
+
+    def derivatives(self, n:int) -> tuple[list[float], list[float]]:
+        """ d/dx and d/dy per component of buffer[n] (1: first varying) """
+        o, size = self.offsets[n - 1]
+        return (self.ddx[o:o + size], self.ddy[o:o + size])
+
+def _kind_of(e) -> type | None:
+    for kind in _SIZES:
+        if isinstance(e, kind):
+            return kind
+    return None
+
+
+class VaryingPlan:
+    """ The layout of the vertex shader buffers of a draw, inspected once.
+        Buffers are flattened to lists of floats, so interpolating a pixel
+        is one pass of multiply-adds however many varyings there are, and
+        the results are written into a reused fragment buffer.
+    """
+    def __init__(self, buffer:list) -> None:
+        self.kinds = []  # per varying: float, int, Vec2 or Vec3
+        self.slots = []  # (index in the vertex buffer, kind, offset)
+        offset = 0
+        for i, e in enumerate(buffer):
+            kind = _kind_of(e)
+            if kind == None:
+                # entries of other types are not passed to the fragment shader
+                continue
+            self.kinds.append(kind)
+            self.slots.append((i, kind, offset))
+            offset += _SIZES[kind]
+        self.size = offset
+        self.length = len(buffer)
+
+    def matches(self, buffer:list) -> bool:
+        return len(buffer) == self.length and all(_kind_of(buffer[i]) is kind for i, kind, _ in self.slots)
+
+    def flatten(self, buffer:list) -> list[float]:
+        values = []
+        for i, kind, _ in self.slots:
+            e = buffer[i]
+            if kind is Vec3:
+                values += (e.x, e.y, e.z)
+            elif kind is Vec2:
+                values += (e.x, e.y)
+            else:
+                values.append(e)
+        return values
+
+    """ new_buffer
+        :returns: a FragmentBuffer [position, varyings...] to be filled
+                  with fill for each pixel
+    """
+    def new_buffer(self) -> list:
+        buffer = FragmentBuffer([ Vec3() ])
+        buffer.offsets = [ (o, _SIZES[kind]) for _, kind, o in self.slots ]
+        buffer.ddx = [ 0.0 ] * self.size
+        buffer.ddy = [ 0.0 ] * self.size
+        for kind in self.kinds:
+            if kind is Vec3:
+                buffer.append(Vec3())
+            elif kind is Vec2:
+                buffer.append(Vec2())
+            else:
+                buffer.append(kind())
+        return buffer
+
+    def fill(self, buffer:list, values:list[float]) -> None:
+        n = 1
+        for _, kind, o in self.slots:
+            if kind is Vec3:
+                e = buffer[n]
+                e.x = values[o]
+                e.y = values[o + 1]
+                e.z = values[o + 2]
+            elif kind is Vec2:
+                e = buffer[n]
+                e.x = values[o]
+                e.y = values[o + 1]
+            elif kind is int:
+                buffer[n] = int(values[o])
+            else:
+                buffer[n] = values[o]
+            n += 1
@@ -1,11 +1,21 @@
 import math
+from array import array
 
 class Vec3:
+    # no per instance __dict__, the renderer makes many of these
+    __slots__ = ("x", "y", "z")
+
     def __init__(self, x:float=0.0, y:float=0.0, z:float=0.0) -> None:
         self.x = x
         self.y = y
         self.z = z
 
+    def set(self, x:float, y:float, z:float):
+        self.x = x
+        self.y = y
+        self.z = z
+        return self
+
     def scale(self, scalar:float):
         self.x *= scalar
         self.y *= scalar
@@ -45,34 +55,74 @@ class Vec3:
         return math.sqrt(self.x**2 + self.y**2 + self.z**2)
 
     def copy(self):
-        return Vec3().add(self)
+        return Vec3(self.x, self.y, self.z)
 
+    # the rotations are Vec2.rotate of two of the components
     def rotate_x(self, rad):
-        vec = Vec2(self.y, self.z).rotate(rad)
-        self.y = vec.x
-        self.z = vec.y
+        cos = math.cos(rad)
+        sin = math.sin(rad)
+        y, z = self.y, self.z
+        self.y = cos * y - sin * z
+        self.z = sin * y + cos * z
         return self
 
     def rotate_y(self, rad):
-        vec = Vec2(self.x, self.z).rotate(rad)
-        self.x = vec.x
-        self.z = vec.y
+        cos = math.cos(rad)
+        sin = math.sin(rad)
+        x, z = self.x, self.z
+        self.x = cos * x - sin * z
+        self.z = sin * x + cos * z
         return self
 
     def rotate_z(self, rad):
-        vec = Vec2(self.x, self.y).rotate(rad)
-        self.x = vec.x
-        self.y = vec.y
+        cos = math.cos(rad)
+        sin = math.sin(rad)
+        x, y = self.x, self.y
+        self.x = cos * x - sin * y
+        self.y = sin * x + cos * y
+        return self
+
+    # fused operations writing into self, no temporary vectors
+
+    def set_lerp(self, a, b, t:float):
+        """ self = a + (b - a) * t, as (1 - t) * a + t * b """
+        s = 1 - t
+        self.x = s * a.x + t * b.x
+        self.y = s * a.y + t * b.y
+        self.z = s * a.z + t * b.z
+        return self
+
+    def set_barycentric(self, a, b, c, w1:float, w2:float, w3:float):
+        """ self = w1 * a + w2 * b + w3 * c """
+        self.x = w1 * a.x + w2 * b.x + w3 * c.x
+        self.y = w1 * a.y + w2 * b.y + w3 * c.y
+        self.z = w1 * a.z + w2 * b.z + w3 * c.z
+        return self
+
+    def set_transform(self, mat, vec):
+        """ self = mat (a Mat4) applied to the point vec, vec can be self """
+        m = mat.m
+        x, y, z = vec.x, vec.y, vec.z
+        self.x = m[0] * x + m[1] * y + m[2] * z + m[3]
+        self.y = m[4] * x + m[5] * y + m[6] * z + m[7]
+        self.z = m[8] * x + m[9] * y + m[10] * z + m[11]
         return self
 
     def __str__(self) -> str:
         return f"[{self.x}, {self.y}, {self.z}]"
 
 class Vec2:
+    __slots__ = ("x", "y")
+
     def __init__(self, x:float=0.0, y:float=0.0) -> None:
         self.x = x
         self.y = y
 
+    def set(self, x:float, y:float):
+        self.x = x
+        self.y = y
+        return self
+
     def scale(self, scalar:float):
         self.x *= scalar
         self.y *= scalar
@@ -101,7 +151,7 @@ class Vec2:
         return math.sqrt(self.x**2 + self.y**2)
 
     def copy(self):
-        return Vec2().add(self)
+        return Vec2(self.x, self.y)
 
     def rotate(self, rad):
         cos = math.cos(rad)
@@ -112,6 +162,19 @@ class Vec2:
         self.y = y
         return self
 
+    def set_lerp(self, a, b, t:float):
+        """ self = a + (b - a) * t, as (1 - t) * a + t * b """
+        s = 1 - t
+        self.x = s * a.x + t * b.x
+        self.y = s * a.y + t * b.y
+        return self
+
+    def set_barycentric(self, a, b, c, w1:float, w2:float, w3:float):
+        """ self = w1 * a + w2 * b + w3 * c """
+        self.x = w1 * a.x + w2 * b.x + w3 * c.x
+        self.y = w1 * a.y + w2 * b.y + w3 * c.y
+        return self
+
     def __str__(self) -> str:
         return f"[{self.x}, {self.y}]"
 
@@ -236,3 +299,153 @@ class Mat3:
                f"[{self.c1.y}, {self.c2.y}, {self.c3.y}]\n"\
                f"[{self.c1.z}, {self.c2.z}, {self.c3.z}]"
 
+
+class Mat4:
+    """ Affine transform, 16 floats row major with the last row 0, 0, 0, 1.
+        Methods changing the matrix apply their transform after the
+        current one (like Mat3.rotate_x) and return self for chaining.
+    """
+    # default is identity matrix
+    def __init__(self, m:list[float]=None) -> None:
+        if m == None:
+            m = [ 1.0, 0.0, 0.0, 0.0,
+                  0.0, 1.0, 0.0, 0.0,
+                  0.0, 0.0, 1.0, 0.0,
+                  0.0, 0.0, 0.0, 1.0 ]
+        self.m = [ float(v) for v in m ]
+        self._inverse = None
+        self._inverse_key = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        """ rows: 3 or 4 rows of 4 numbers (3x4 or 4x4 affine) """
+        m = [ float(v) for row in rows[:3] for v in row ]
+        return cls(m + [ 0.0, 0.0, 0.0, 1.0 ])
+
+    def translate(self, vec:Vec3):
+        m = self.m
+        m[3] += vec.x
+        m[7] += vec.y
+        m[11] += vec.z
+        return self
+
+    def scale(self, scalar:float|Vec3):
+        if not isinstance(scalar, Vec3):
+            scalar = Vec3(scalar, scalar, scalar)
+        m = self.m
+        for r, s in ((0, scalar.x), (4, scalar.y), (8, scalar.z)):
+            m[r] *= s
+            m[r + 1] *= s
+            m[r + 2] *= s
+            m[r + 3] *= s
+        return self
+
+    def rotate_x(self, rad):
+        return self._rotate(4, 8, rad)
+
+    def rotate_y(self, rad):
+        # same sense as Vec3.rotate_y, which rotates (x, z)
+        return self._rotate(0, 8, rad)
+
+    def rotate_z(self, rad):
+        return self._rotate(0, 4, rad)
+
+    # rotates rows a and b in place, no temporary matrix
+    def _rotate(self, a:int, b:int, rad):
+        cos = math.cos(rad)
+        sin = math.sin(rad)
+        m = self.m
+        for i in range(4):
+            u = m[a + i]
+            v = m[b + i]
+            m[a + i] = cos * u - sin * v
+            m[b + i] = sin * u + cos * v
+        return self
+
+    def mult(self, other):
+        """ self * other, the transform applying other first, then self """
+        a = self.m
+        b = other.m
+        result = []
+        for r in range(0, 12, 4):
+            a0, a1, a2, a3 = a[r:r + 4]
+            result += (
+                a0 * b[0] + a1 * b[4] + a2 * b[8],
+                a0 * b[1] + a1 * b[5] + a2 * b[9],
+                a0 * b[2] + a1 * b[6] + a2 * b[10],
+                a0 * b[3] + a1 * b[7] + a2 * b[11] + a3
+            )
+        return Mat4(result + [ 0.0, 0.0, 0.0, 1.0 ])
+
+    def inverse(self):
+        """ the inverse transform, cached until the matrix changes """
+        key = tuple(self.m)
+        if key == self._inverse_key:
+            return self._inverse
+        m = self.m
+        c1 = Vec3(m[0], m[4], m[8])
+        c2 = Vec3(m[1], m[5], m[9])
+        c3 = Vec3(m[2], m[6], m[10])
+        # rows of the inverted 3x3 part are the cross products of its
+        # columns over the determinant
+        r1 = c2.cross(c3)
+        r2 = c3.cross(c1)
+        r3 = c1.cross(c2)
+        inv_det = 1 / c1.dot(r1)
+        t = Vec3(m[3], m[7], m[11])
+        inverse = []
+        for r in (r1, r2, r3):
+            r.scale(inv_det)
+            inverse += (r.x, r.y, r.z, -r.dot(t))
+        self._inverse = Mat4(inverse + [ 0.0, 0.0, 0.0, 1.0 ])
+        self._inverse_key = key
+        return self._inverse
+
+    def copy(self):
+        return Mat4(self.m)
+
+    def transform_point(self, vec:Vec3, out:Vec3=None) -> Vec3:
+        """ out: optional Vec3 to write the result into (can be vec) """
+        return (out if out != None else Vec3()).set_transform(self, vec)
+
+    def transform_vec(self, vec:Vec3) -> Vec3:
+        """ directions: the translation is not applied """
+        m = self.m
+        x, y, z = vec.x, vec.y, vec.z
+        return Vec3(
+                m[0] * x + m[1] * y + m[2] * z,
+                m[4] * x + m[5] * y + m[6] * z,
+                m[8] * x + m[9] * y + m[10] * z
+            )
+
+    def transform_points(self, points, out=None):
+        """ points: flat x, y, z buffer (array, memoryview, list) or a numpy
+                    (N, 3) array
+            out: optional flat buffer for the result (default: new
+                 array('d'), or a numpy array for numpy input)
+        """
+        m = self.m
+        if hasattr(points, "__array_interface__") and len(getattr(points, "shape", ())) == 2:
+            import numpy as np
+            rows = np.array(m[:12]).reshape(3, 4)
+            result = np.asarray(points) @ rows[:, :3].T + rows[:, 3]
+            if out is not None:
+                out[...] = result
+                return out
+            return result
+
+        if out is None:
+            out = array("d", bytes(8 * len(points)))
+        m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11 = m[:12]
+        for i in range(0, len(points) - 2, 3):
+            x = points[i]
+            y = points[i + 1]
+            z = points[i + 2]
+            out[i] = m0 * x + m1 * y + m2 * z + m3
+            out[i + 1] = m4 * x + m5 * y + m6 * z + m7
+            out[i + 2] = m8 * x + m9 * y + m10 * z + m11
+        return out
+
+    def __str__(self) -> str:
+        m = self.m
+        return "\n".join(f"[{m[r]}, {m[r + 1]}, {m[r + 2]}, {m[r + 3]}]" for r in range(0, 16, 4))
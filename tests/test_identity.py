@@ -0,0 +1,134 @@
+""" The render paths that promise pixels identical to the reference (Python
+    backend, one process) checked on the cube scenes at a small size:
+    numpy backend, worker processes, early_z, BVH culling and rerender.
+
+        python -m pytest -q
+"""
+import os
+import sys
+import importlib
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import src.renderer as renderer
+from src.vmath import Vec3
+from src.bvh import BVH
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+SCENES = ("cube.py", "cube2.py", "cube3.py")
+WIDTH = 160
+
+
+""" load_scene
+    :params: file name of a cube script
+    :returns: (a Renderer set up like the script's default renderer, the
+              script's VERTICES)
+"""
+# The script runs up to its preview/render part with a smaller screen,
+# on freshly reset module globals.
+def load_scene(name:str) -> tuple:
+    importlib.reload(renderer)
+    with open(os.path.join(ROOT, name)) as file:
+        source = file.read()
+    source = source[:source.index("\nif PREVIEW:")]
+    source = source.replace("CW = 640", f"CW = {WIDTH}")
+    namespace = { "__name__": "scene" }
+    exec(compile(source, name, "exec"), namespace)
+
+    scene = renderer.Renderer()
+    for attribute in renderer._SHARED:
+        setattr(scene, attribute, getattr(renderer, attribute))
+    scene.framebuffer = None
+    return scene, namespace["VERTICES"]
+
+def frame(scene:renderer.Renderer) -> tuple[bytes, bytes]:
+    return (bytes(scene.framebuffer.color), bytes(scene.framebuffer.depth))
+
+def render(scene:renderer.Renderer) -> tuple[bytes, bytes]:
+    scene.init()
+    scene.render()
+    return frame(scene)
+
+
+class IdentityTest(unittest.TestCase):
+    # compares the frames by the number of differing bytes, unittest's diff
+    # of two large bytes objects takes minutes
+    def assertSameFrame(self, first:tuple, second:tuple) -> None:
+        for name, a, b in zip(("color", "depth"), first, second):
+            self.assertEqual(len(a), len(b), f"{name} sizes differ")
+            differing = sum(x != y for x, y in zip(a, b))
+            self.assertTrue(differing == 0, f"{differing} {name} bytes differ")
+
+    def check(self, configure) -> None:
+        for name in SCENES:
+            with self.subTest(scene=name):
+                scene, _ = load_scene(name)
+                expected = render(scene)
+                self.assertNotEqual(len(set(expected[0])), 1, "empty reference frame")
+                scene, _ = load_scene(name)
+                configure(scene)
+                self.assertSameFrame(render(scene), expected)
+
+    @unittest.skipIf(numpy == None, "numpy is not installed")
+    def test_numpy_backend(self) -> None:
+        def configure(scene):
+            scene.backend = "numpy"
+        self.check(configure)
+
+    def test_workers(self) -> None:
+        def configure(scene):
+            scene.workers = 2
+            scene.tile_size = 32
+        self.check(configure)
+
+    def test_early_z(self) -> None:
+        def configure(scene):
+            scene.early_z = True
+        self.check(configure)
+
+    def test_bvh(self) -> None:
+        def configure(scene):
+            scene.bvh = BVH(scene.mesh, leaf_size=2)
+        self.check(configure)
+
+    def test_on_tile(self) -> None:
+        tiles = []
+        def configure(scene):
+            scene.on_tile = lambda framebuffer, rect: tiles.append(rect)
+        self.check(configure)
+        self.assertTrue(tiles)
+
+    def test_rerender(self) -> None:
+        for name in SCENES:
+            with self.subTest(scene=name):
+                scene, vertices = load_scene(name)
+                expected = render(scene)
+                scene.incremental = True
+                render(scene)
+
+                # move a visible corner, compare with a full render of the
+                # moved cube
+                corner = vertices[1][0]
+                original = corner.copy()
+                corner.add(Vec3(0.8, -0.4, 0.0))
+                scene.rerender([1])
+                moved = frame(scene)
+                full, _ = load_scene(name)
+                full.vertices = vertices
+                self.assertSameFrame(moved, render(full))
+                self.assertTrue(moved != expected, "the moved corner isn't visible")
+
+                corner.set(original.x, original.y, original.z)
+                scene.rerender([1])
+                self.assertSameFrame(frame(scene), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+""" The binary mesh cache written by load_mesh: a cached load gives the mesh
+    the parser gives, and a damaged or stale cache is parsed again.
+
+        python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.loaders import CACHE_SUFFIX, load_mesh, load_obj
+
+
+# a quad (split into two triangles) and a triangle, with normals and uvs
+OBJ = """\
+v 0.0 0.0 0.0
+v 1.5 0.0 0.0
+v 1.5 2.25 0.0
+v 0.0 2.25 -0.125
+v 3.0 1.0 0.5
+vt 0.0 0.0
+vt 1.0 0.0
+vt 1.0 1.0
+vt 0.0 1.0
+vn 0.0 0.0 1.0
+vn 0.6 0.0 0.8
+f 1/1/1 2/2/1 3/3/1 4/4/1
+f 2/2/2 5/3/2 3/4/2
+"""
+
+
+""" contents
+    :params: a Mesh
+    :returns: (positions, indices, {name: (kind, values)}) as plain lists
+"""
+def contents(mesh) -> tuple:
+    attributes = { name: (kind, list(values)) for name, (kind, values) in mesh.attributes.items() }
+    return (list(mesh.positions), list(mesh.indices), attributes)
+
+
+class CacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "mesh.obj")
+        self.cache_path = self.path + CACHE_SUFFIX
+        with open(self.path, "w") as file:
+            file.write(OBJ)
+        self.expected = contents(load_obj(self.path))
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_round_trip(self) -> None:
+        self.assertEqual(contents(load_mesh(self.path)), self.expected)
+        self.assertTrue(os.path.exists(self.cache_path))
+
+        mesh = load_mesh(self.path)
+        self.assertIsInstance(mesh.positions, memoryview, "not loaded from the cache")
+        self.assertEqual(contents(mesh), self.expected)
+        self.assertEqual(set(mesh.attributes), { "normal", "uv" })
+
+    def test_without_cache(self) -> None:
+        self.assertEqual(contents(load_mesh(self.path, cache=False)), self.expected)
+        self.assertFalse(os.path.exists(self.cache_path))
+
+    def test_truncated_cache(self) -> None:
+        load_mesh(self.path)
+        size = os.path.getsize(self.cache_path)
+        # cut inside the last index and at a value boundary
+        for cut in (6, 4):
+            with self.subTest(cut=cut):
+                with open(self.cache_path, "r+b") as file:
+                    file.truncate(size - cut)
+                mesh = load_mesh(self.path)
+                self.assertNotIsInstance(mesh.positions, memoryview, "truncated cache was used")
+                self.assertEqual(contents(mesh), self.expected)
+                # and written again
+                self.assertEqual(os.path.getsize(self.cache_path), size)
+
+    def test_stale_cache(self) -> None:
+        load_mesh(self.path)
+        with open(self.path, "a") as file:
+            file.write("f 1/1/1 3/3/1 5/4/2\n")
+        expected = contents(load_obj(self.path))
+        self.assertNotEqual(expected, self.expected)
+        self.assertEqual(contents(load_mesh(self.path)), expected)
+        self.assertEqual(contents(load_mesh(self.path)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()